@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import auth, users, projects, layers, elements, nlp
+from app.api.api_v1.endpoints import auth, users, projects, layers, elements, nlp, admin, spatial
 
 api_router = APIRouter()
 
@@ -8,6 +8,8 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
+api_router.include_router(spatial.router, prefix="/projects", tags=["spatial"])
 api_router.include_router(layers.router, prefix="/layers", tags=["layers"])
 api_router.include_router(elements.router, prefix="/elements", tags=["elements"])
-api_router.include_router(nlp.router, prefix="/nlp", tags=["nlp"])
\ No newline at end of file
+api_router.include_router(nlp.router, prefix="/nlp", tags=["nlp"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
\ No newline at end of file
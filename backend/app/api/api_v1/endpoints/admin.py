@@ -0,0 +1,76 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.api import deps
+from app.core.config import settings
+from app.core.profiling import ProfileStore
+from app.models.user import User
+from app.services.element_writer import element_writer
+from app.services.spatial_index import spatial_indexes
+from app.services.tiles import tile_service
+
+router = APIRouter()
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+
+@router.get("/profiles")
+async def list_profiles(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Listar los perfiles capturados (más recientes primero)
+    """
+    return {"enabled": settings.PROFILING_ENABLED, "profiles": profile_store.list()}
+
+
+@router.get("/profiles/{name}")
+async def download_profile(
+    name: str,
+    format: str = "pstats",
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Descargar un perfil en formato pstats o como resumen de texto (format=text)
+    """
+    if format == "text":
+        text = profile_store.as_text(name)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Perfil no encontrado")
+        return PlainTextResponse(text)
+    
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+
+@router.get("/group-commit")
+async def get_group_commit_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Estadísticas de la escritura agrupada de elementos
+    """
+    return {"enabled": settings.GROUP_COMMIT_ENABLED, **element_writer.stats()}
+
+@router.get("/spatial-index")
+async def get_spatial_index_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Estadísticas de la caché de índices espaciales por proyecto
+    """
+    return spatial_indexes.stats()
+
+
+@router.get("/tiles")
+async def get_tile_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Estadísticas de generación y caché de teselas vectoriales
+    """
+    return tile_service.stats()
@@ -9,12 +9,32 @@ from app import schemas
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.security import PasswordHasherBusy
 from app.models.user import User
 from app.db.session import get_db
 
 router = APIRouter()
 
+hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Servidor ocupado, inténtelo de nuevo en unos segundos",
+    headers={"Retry-After": "1"},
+)
+
+
+async def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await security.verify_password_async(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
+
+
+async def _hash_password(password: str) -> str:
+    try:
+        return await security.get_password_hash_async(password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
+
 
 @router.post("/access-token", response_model=schemas.Token)
 async def login_access_token(
@@ -41,7 +61,7 @@ async def login_access_token(
             detail="Nombre de usuario o contraseña incorrectos",
         )
     
-    if not security.verify_password(form_data.password, user.hashed_password):
+    if not await _verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nombre de usuario o contraseña incorrectos",
@@ -93,7 +113,7 @@ async def register_user(
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await _hash_password(user_in.password),
         is_active=True,
         is_superuser=False,
     )
@@ -101,4 +121,24 @@ async def register_user(
     await db.commit()
     await db.refresh(user)
     
-    return user
\ No newline at end of file
+    return user
+
+
+@router.get("/cache-stats")
+async def get_auth_cache_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Estadísticas de aciertos y fallos de la caché de autenticación
+    """
+    return deps.auth_cache_stats()
+
+
+@router.get("/hash-stats")
+async def get_password_hash_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Métricas del pool de hashing de contraseñas
+    """
+    return security.hash_metrics.snapshot()
\ No newline at end of file
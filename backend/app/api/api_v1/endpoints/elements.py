@@ -1,41 +1,87 @@
-from typing import Any, List
+import asyncio
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.api import deps
+from app.core.config import settings
+from app.core.negotiation import negotiated_response
 from app.models.element import Element
-from app.models.project import Project
 from app.models.layer import Layer
-from app.db.session import get_db
+from app.models.project import Project
+from app.models.tombstone import Tombstone
+from app.db.pagination import estimated_count, exact_count
+from app.db.revision import bump_project_revision, bump_project_revisions
+from app.db.session import get_db, get_read_db
+from app.services.change_hub import change_hub, make_change
+from app.services.element_writer import element_writer
+from app.services.lod import geometry_simplifier, level_of_detail, visible_size_filter
+from app.utils.geometry import bbox_values, geometry_bbox, parse_bbox
+from app.utils.serialization import ELEMENT_COLUMNS, element_list_payload, element_list_to_binary
+from app.utils.transform import affine, batch_matrices, polar_array, rectangular_array, transform_geometries
 
 router = APIRouter()
 
+BBOX_COLUMNS = ("min_x", "min_y", "max_x", "max_y")
+
 @router.get("/", response_model=schemas.ElementList)
 async def get_elements(
-    project_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    project_id: int = Depends(deps.get_project_access),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(deps.get_current_user),
     layer_id: int = None,
     element_type: str = None,
+    bbox: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[int] = None,
+    count: Optional[Literal["exact", "estimate", "none"]] = None,
+    tolerance: Optional[float] = None,
+    zoom: Optional[float] = None,
 ) -> Any:
     """
-    Obtener elementos de un proyecto
+    Obtener elementos de un proyecto.
+    Con bbox=minx,miny,maxx,maxy solo se devuelven los elementos que intersectan la ventana.
+    Con cursor se pagina por id (keyset) en lugar de offset; next_cursor indica la siguiente página.
+    count elige entre total exacto, estimado o sin total; por defecto es exacto con offset
+    y sin total con cursor, para que recorrer un proyecto por páginas no cuente en cada una.
+    Con tolerance (unidades del dibujo) o zoom (píxeles por unidad) se devuelve un nivel de
+    detalle reducido: polilíneas simplificadas, coordenadas redondeadas y sin elementos
+    menores que un píxel.
+    La respuesta se serializa directamente desde las filas (mismo JSON que ElementList),
+    en MessagePack si Accept lo pide y comprimida según Accept-Encoding.
     """
-    # Verificar que el proyecto pertenezca al usuario
-    project_query = select(Project).where(Project.id == project_id, Project.user_id == current_user.id)
-    project_result = await db.execute(project_query)
-    project = project_result.scalar_one_or_none()
+    try:
+        lod = level_of_detail(tolerance, zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if not project:
-        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    bbox_filter = None
+    if bbox:
+        try:
+            min_x, min_y, max_x, max_y = parse_bbox(bbox)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Parámetro bbox inválido: {str(e)}")
+        # Los elementos sin caja calculada se devuelven siempre
+        bbox_filter = or_(
+            Element.min_x.is_(None),
+            and_(
+                Element.max_x >= min_x,
+                Element.min_x <= max_x,
+                Element.max_y >= min_y,
+                Element.min_y <= max_y,
+            ),
+        )
     
-    # Construir query base
-    query = select(Element).where(Element.project_id == project_id)
+    # Construir query base (la propiedad del proyecto la verifica get_project_access)
+    # Solo las columnas de la respuesta: sin hidratar objetos ORM
+    query = select(*ELEMENT_COLUMNS).where(Element.project_id == project_id)
     
     # Aplicar filtros adicionales
     if layer_id:
@@ -44,24 +90,45 @@ async def get_elements(
     if element_type:
         query = query.where(Element.type == element_type)
     
-    # Paginación
-    query = query.offset(skip).limit(limit)
+    if bbox_filter is not None:
+        query = query.where(bbox_filter)
+    
+    # Los elementos menores que un píxel se descartan en la base de datos
+    if lod is not None:
+        query = query.where(visible_size_filter(lod))
+    
+    # Contar total (sin paginación) con count(*) en la base de datos
+    if count is None:
+        count = "none" if cursor is not None else "exact"
+    total = None
+    if count == "exact":
+        total = await exact_count(db, query)
+    elif count == "estimate":
+        total = await estimated_count(db, query)
+    
+    # Paginación: keyset sobre id si hay cursor, offset en caso contrario
+    page_query = query.order_by(Element.id)
+    if cursor is not None:
+        page_query = page_query.where(Element.id > cursor)
+    else:
+        page_query = page_query.offset(skip)
+    page_query = page_query.limit(limit)
     
     # Ejecutar query
-    result = await db.execute(query)
-    elements = result.scalars().all()
+    result = await db.execute(page_query)
+    rows = result.mappings().all()
     
-    # Contar total (sin paginación)
-    count_query = select(Element).where(Element.project_id == project_id)
-    if layer_id:
-        count_query = count_query.where(Element.layer_id == layer_id)
-    if element_type:
-        count_query = count_query.where(Element.type == element_type)
+    next_cursor = rows[-1]["id"] if rows and len(rows) == limit else None
     
-    count_result = await db.execute(count_query)
-    total = len(count_result.scalars().all())
+    if lod is not None:
+        rows = [geometry_simplifier.simplify_row(row, lod) for row in rows]
     
-    return {"elements": elements, "total": total}
+    return negotiated_response(
+        request.headers,
+        element_list_payload(rows, total, next_cursor),
+        "elements",
+        to_binary=element_list_to_binary,
+    )
 
 @router.post("/", response_model=schemas.Element)
 async def create_element(
@@ -73,41 +140,370 @@ async def create_element(
     """
     Crear nuevo elemento
     """
-    # Verificar que el proyecto pertenezca al usuario
-    project_query = select(Project).where(
-        Project.id == element_in.project_id, 
-        Project.user_id == current_user.id
+    # Verificar que el proyecto y la capa pertenezcan al usuario (en caché tras la primera vez)
+    await deps.authorize_project(db, current_user.id, element_in.project_id, element_in.layer_id)
+    
+    if settings.GROUP_COMMIT_ENABLED:
+        # La sesión de la petición no se usa más: se cierra para no retener la conexión
+        # (en una transacción abierta por la autorización) mientras el lote se escribe
+        await db.close()
+        # Inserción agrupada con otras peticiones concurrentes (un INSERT y un commit por lote)
+        element = await element_writer.submit({
+            "project_id": element_in.project_id,
+            "layer_id": element_in.layer_id,
+            "type": element_in.type,
+            "geometry": element_in.geometry,
+            "style": element_in.style.model_dump(),
+            "selected": element_in.selected,
+            "locked": element_in.locked,
+            "metadata": element_in.metadata or {},
+            **bbox_values(element_in.type, element_in.geometry),
+        })
+        element_data = schemas.Element.model_validate(element)
+    else:
+        revision = await bump_project_revision(db, element_in.project_id)
+        
+        # Crear elemento
+        element = Element(
+            project_id=element_in.project_id,
+            layer_id=element_in.layer_id,
+            type=element_in.type,
+            geometry=element_in.geometry,
+            style=element_in.style,
+            selected=element_in.selected,
+            locked=element_in.locked,
+            metadata=element_in.metadata or {},
+            revision=revision,
+            **bbox_values(element_in.type, element_in.geometry),
+        )
+        db.add(element)
+        await db.commit()
+        await db.refresh(element)
+        element_data = schemas.Element.model_validate(element)
+    
+    change_hub.publish(element_data.project_id, [make_change(
+        "element", "upsert", element_data.id, element_data.revision,
+        element_data.model_dump(mode="json"),
+    )])
+    
+    return element_data
+
+
+@router.post("/bulk", response_model=schemas.ElementBulkResult)
+async def create_elements_bulk(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_user),
+    bulk_in: schemas.ElementBulkCreate,
+) -> Any:
+    """
+    Crear varios elementos en una sola transacción
+    """
+    if not bulk_in.elements:
+        return {"ids": []}
+    
+    # Verificar propiedad una vez por proyecto y capa distintos
+    await deps.authorize_projects(db, current_user.id, {e.project_id for e in bulk_in.elements})
+    await deps.authorize_layers(db, current_user.id, {(e.layer_id, e.project_id) for e in bulk_in.elements})
+    
+    revisions = await bump_project_revisions(db, (e.project_id for e in bulk_in.elements))
+    
+    rows = [
+        {
+            "project_id": e.project_id,
+            "layer_id": e.layer_id,
+            "type": e.type,
+            "geometry": e.geometry,
+            "style": e.style.model_dump(),
+            "selected": e.selected,
+            "locked": e.locked,
+            "metadata": e.metadata or {},
+            "revision": revisions[e.project_id],
+            **bbox_values(e.type, e.geometry),
+        }
+        for e in bulk_in.elements
+    ]
+    
+    # INSERT multi-fila con RETURNING en el mismo orden de la petición
+    result = await db.execute(
+        insert(Element).returning(Element.id, sort_by_parameter_order=True), rows
     )
-    project_result = await db.execute(project_query)
-    project = project_result.scalar_one_or_none()
+    ids = list(result.scalars().all())
+    await db.commit()
     
-    if not project:
-        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    for element_id, e in zip(ids, bulk_in.elements):
+        change_hub.publish(e.project_id, [make_change(
+            "element", "upsert", element_id, revisions[e.project_id],
+            {"id": element_id, "revision": revisions[e.project_id], **e.model_dump(mode="json")},
+        )])
     
-    # Verificar que la capa exista y pertenezca al proyecto
-    layer_query = select(Layer).where(
-        Layer.id == element_in.layer_id,
-        Layer.project_id == element_in.project_id
+    return {"ids": ids}
+
+
+@router.put("/bulk", response_model=schemas.ElementBulkResult)
+async def update_elements_bulk(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_user),
+    bulk_in: schemas.ElementBulkUpdate,
+) -> Any:
+    """
+    Actualizar varios elementos en una sola transacción.
+    Cada entrada contiene el id del elemento y los campos a modificar.
+    """
+    changes: Dict[int, Dict[str, Any]] = {}
+    for item in bulk_in.elements:
+        try:
+            element_id = int(item["id"])
+            fields = schemas.ElementUpdate.model_validate(
+                {k: v for k, v in item.items() if k != "id"}
+            ).model_dump(exclude_unset=True)
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Entrada de actualización inválida: {str(e)}")
+        changes.setdefault(element_id, {}).update(fields)
+    
+    if not changes:
+        return {"ids": []}
+    
+    # Cargar los elementos afectados verificando la propiedad del proyecto
+    query = (
+        select(Element.id, Element.project_id, Element.type, Element.geometry)
+        .join(Project, Project.id == Element.project_id)
+        .where(Element.id.in_(changes.keys()), Project.user_id == current_user.id)
     )
-    layer_result = await db.execute(layer_query)
-    layer = layer_result.scalar_one_or_none()
-    
-    if not layer:
-        raise HTTPException(status_code=404, detail="Capa no encontrada")
-    
-    # Crear elemento
-    element = Element(
-        project_id=element_in.project_id,
-        layer_id=element_in.layer_id,
-        type=element_in.type,
-        geometry=element_in.geometry,
-        style=element_in.style,
-        selected=element_in.selected,
-        locked=element_in.locked,
-        metadata=element_in.metadata or {},
+    result = await db.execute(query)
+    current = {row.id: row for row in result.all()}
+    if len(current) != len(changes):
+        raise HTTPException(status_code=404, detail="Elemento no encontrado")
+    
+    layer_pairs = {
+        (fields["layer_id"], current[element_id].project_id)
+        for element_id, fields in changes.items()
+        if fields.get("layer_id") is not None
+    }
+    if layer_pairs:
+        await deps.authorize_layers(db, current_user.id, layer_pairs)
+    
+    rows = []
+    for element_id, fields in changes.items():
+        row = {"id": element_id, **{k: v for k, v in fields.items() if v is not None}}
+        if "geometry" in row or "type" in row:
+            row.update(bbox_values(
+                row.get("type", current[element_id].type),
+                row.get("geometry", current[element_id].geometry),
+            ))
+        if len(row) > 1:
+            rows.append(row)
+    
+    # UPDATE masivo por clave primaria
+    if rows:
+        revisions = await bump_project_revisions(db, (current[row["id"]].project_id for row in rows))
+        for row in rows:
+            row["revision"] = revisions[current[row["id"]].project_id]
+        await db.execute(update(Element), rows)
+    await db.commit()
+    
+    for row in rows:
+        data = {k: v for k, v in row.items() if k not in ("min_x", "min_y", "max_x", "max_y")}
+        change_hub.publish(current[row["id"]].project_id, [make_change(
+            "element", "upsert", row["id"], row["revision"], data,
+        )])
+    
+    return {"ids": list(changes.keys())}
+
+
+@router.post("/transform", response_model=schemas.ElementBulkResult)
+async def transform_elements(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_user),
+    transform_in: schemas.ElementTransform,
+) -> Any:
+    """
+    Mover, girar, escalar o reflejar una selección con una matriz afín, o copiarla en
+    matriz rectangular o polar, con una sola sentencia de escritura.
+    La selección combina ids y filtros (layer_id, element_type y bbox, que toma los
+    elementos contenidos en la ventana); se omiten los elementos y capas bloqueados.
+    Devuelve los ids modificados o, si se crean copias, los ids de las copias.
+    """
+    project_id = transform_in.project_id
+    await deps.authorize_project(db, current_user.id, project_id, transform_in.layer_id)
+
+    locked_layers = select(Layer.id).where(Layer.project_id == project_id, Layer.locked.is_(True))
+    query = (
+        select(*ELEMENT_COLUMNS, *(Element.__table__.c[name] for name in BBOX_COLUMNS))
+        .where(
+            Element.project_id == project_id,
+            Element.locked.is_not(True),
+            Element.layer_id.not_in(locked_layers),
+        )
+        .order_by(Element.id)
+        .limit(settings.TRANSFORM_MAX_ELEMENTS + 1)
     )
-    db.add(element)
+    if transform_in.ids is not None:
+        query = query.where(Element.id.in_(set(transform_in.ids)))
+    if transform_in.layer_id is not None:
+        query = query.where(Element.layer_id == transform_in.layer_id)
+    if transform_in.element_type:
+        query = query.where(Element.type == transform_in.element_type)
+    if transform_in.bbox is not None:
+        min_x, min_y, max_x, max_y = transform_in.bbox
+        query = query.where(
+            Element.min_x >= min_x, Element.max_x <= max_x,
+            Element.min_y >= min_y, Element.max_y <= max_y,
+        )
+
+    rows = (await db.execute(query)).mappings().all()
+    if len(rows) > settings.TRANSFORM_MAX_ELEMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La selección supera el máximo de {settings.TRANSFORM_MAX_ELEMENTS} elementos",
+        )
+    if not rows:
+        return {"ids": []}
+
+    # Operaciones: una matriz (mover o copiar una vez) o las de la matriz de copias
+    array = transform_in.array
+    anchors = None
+    if array is None:
+        operations = affine(*transform_in.matrix)[None]
+    elif array.kind == "rectangular":
+        operations = rectangular_array(array.rows, array.columns, array.row_spacing, array.column_spacing)
+    else:
+        operations = polar_array(array.count, array.center.x, array.center.y, array.angle)
+        if not array.rotate_items:
+            # Las copias se trasladan siguiendo el giro del centro de su caja; la caja se
+            # calcula de la geometría si falta y se omiten los elementos sin caja posible
+            boxes = [
+                (row["min_x"], row["min_y"], row["max_x"], row["max_y"])
+                if row["min_x"] is not None else geometry_bbox(row["type"], row["geometry"])
+                for row in rows
+            ]
+            rows = [row for row, box in zip(rows, boxes) if box is not None]
+            if not rows:
+                return {"ids": []}
+            anchors = np.array([
+                ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2) for box in boxes if box is not None
+            ])
+
+    duplicate = array is not None or transform_in.duplicate
+    if duplicate and len(operations) * len(rows) > settings.TRANSFORM_MAX_COPIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La operación crearía más de {settings.TRANSFORM_MAX_COPIES} elementos",
+        )
+    if not len(operations):
+        return {"ids": []}
+
+    matrices, element_index = batch_matrices(operations, len(rows), anchors)
+    types = [rows[i]["type"] for i in element_index]
+    geometries = [rows[i]["geometry"] for i in element_index]
+    # Cálculo vectorizado fuera del bucle de eventos
+    try:
+        results = await asyncio.get_running_loop().run_in_executor(
+            None, transform_geometries, types, geometries, matrices
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    transformed = [
+        (rows[i], result) for i, result in zip(element_index, results) if result is not None
+    ]
+    if not transformed:
+        return {"ids": []}
+
+    revision = await bump_project_revision(db, project_id)
+    if duplicate:
+        new_rows = [
+            {
+                "project_id": project_id,
+                "layer_id": row["layer_id"],
+                "type": element_type,
+                "geometry": geometry,
+                "style": row["style"],
+                "selected": False,
+                "locked": False,
+                "metadata": row["metadata"] or {},
+                "revision": revision,
+                **bbox_values(element_type, geometry),
+            }
+            for row, (element_type, geometry) in transformed
+        ]
+        # INSERT multi-fila con RETURNING en el orden de las copias
+        result = await db.execute(
+            insert(Element).returning(Element.id, sort_by_parameter_order=True), new_rows
+        )
+        ids = list(result.scalars().all())
+        changed = [{"id": element_id, **data} for element_id, data in zip(ids, new_rows)]
+    else:
+        changed = [
+            {
+                "id": row["id"],
+                "type": element_type,
+                "geometry": geometry,
+                "revision": revision,
+                **bbox_values(element_type, geometry),
+            }
+            for row, (element_type, geometry) in transformed
+        ]
+        # UPDATE masivo por clave primaria
+        await db.execute(update(Element), changed)
+        ids = [data["id"] for data in changed]
+    await db.commit()
+
+    change_hub.publish(project_id, [
+        make_change(
+            "element", "upsert", data["id"], revision,
+            {k: v for k, v in data.items() if k not in BBOX_COLUMNS},
+        )
+        for data in changed
+    ])
+
+    return {"ids": ids}
+
+
+@router.delete("/bulk", response_model=schemas.ElementBulkResult)
+async def delete_elements_bulk(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_user),
+    bulk_in: schemas.ElementBulkDelete,
+) -> Any:
+    """
+    Eliminar varios elementos en una sola sentencia
+    """
+    ids = set(bulk_in.ids)
+    if not ids:
+        return {"ids": []}
+    
+    owned_projects = select(Project.id).where(Project.user_id == current_user.id)
+    query = (
+        delete(Element)
+        .where(Element.id.in_(ids), Element.project_id.in_(owned_projects))
+        .returning(Element.id, Element.project_id)
+    )
+    result = await db.execute(query)
+    deleted_rows = result.all()
+    deleted = [row.id for row in deleted_rows]
+    
+    if len(deleted) != len(ids):
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Elemento no encontrado")
+    revisions = await bump_project_revisions(db, (row.project_id for row in deleted_rows))
+    await db.execute(insert(Tombstone), [
+        {
+            "project_id": row.project_id,
+            "entity_type": "element",
+            "entity_id": row.id,
+            "revision": revisions[row.project_id],
+        }
+        for row in deleted_rows
+    ])
     await db.commit()
-    await db.refresh(element)
     
-    return element
\ No newline at end of file
+    for row in deleted_rows:
+        change_hub.publish(row.project_id, [make_change(
+            "element", "delete", row.id, revisions[row.project_id],
+        )])
+    
+    return {"ids": deleted}
\ No newline at end of file
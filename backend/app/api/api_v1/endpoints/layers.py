@@ -1,21 +1,22 @@
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.api import deps
 from app.models.layer import Layer
-from app.models.project import Project
-from app.db.session import get_db
+from app.db.revision import bump_project_revision
+from app.services.change_hub import change_hub, make_change
+from app.db.session import get_db, get_read_db
 
 router = APIRouter()
 
 @router.get("/", response_model=schemas.LayerList)
 async def get_layers(
-    project_id: int,
-    db: AsyncSession = Depends(get_db),
+    project_id: int = Depends(deps.get_project_access),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100,
@@ -23,15 +24,7 @@ async def get_layers(
     """
     Obtener capas de un proyecto
     """
-    # Verificar que el proyecto pertenezca al usuario
-    project_query = select(Project).where(Project.id == project_id, Project.user_id == current_user.id)
-    project_result = await db.execute(project_query)
-    project = project_result.scalar_one_or_none()
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
-    
-    # Obtener capas
+    # Obtener capas (la propiedad del proyecto la verifica get_project_access)
     query = select(Layer).where(Layer.project_id == project_id).offset(skip).limit(limit)
     result = await db.execute(query)
     layers = result.scalars().all()
@@ -48,16 +41,10 @@ async def create_layer(
     """
     Crear nueva capa
     """
-    # Verificar que el proyecto pertenezca al usuario
-    project_query = select(Project).where(
-        Project.id == layer_in.project_id, 
-        Project.user_id == current_user.id
-    )
-    project_result = await db.execute(project_query)
-    project = project_result.scalar_one_or_none()
+    # Verificar que el proyecto pertenezca al usuario (en caché tras la primera vez)
+    await deps.authorize_project(db, current_user.id, layer_in.project_id)
     
-    if not project:
-        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    revision = await bump_project_revision(db, layer_in.project_id)
     
     # Crear capa
     layer = Layer(
@@ -67,9 +54,15 @@ async def create_layer(
         locked=layer_in.locked,
         color=layer_in.color,
         order=layer_in.order,
+        revision=revision,
     )
     db.add(layer)
     await db.commit()
     await db.refresh(layer)
     
+    change_hub.publish(layer.project_id, [make_change(
+        "layer", "upsert", layer.id, layer.revision,
+        schemas.Layer.model_validate(layer).model_dump(mode="json"),
+    )])
+    
     return layer
\ No newline at end of file
@@ -1,10 +1,26 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
+from app.core.config import settings
+from app.db.revision import bump_project_revision
 from app.db.session import get_db
+from app.models.element import Element
+from app.models.layer import Layer
+from app.models.project import Project
+from app.models.project_setting import ProjectSettings
 from app.models.user import User
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from app.schemas.element import ElementStyle
+from app.services.change_hub import change_hub, make_change
+from app.services.command_parser import command_parser, split_script
+from app.services.intent_model import intent_model
+from app.utils.geometry import bbox_values
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -18,6 +34,49 @@ class CommandResponse(BaseModel):
     action: Optional[str] = None
     params: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    # Origen del reconocimiento: reglas o modelo de intenciones
+    source: Optional[str] = None
+    confidence: Optional[float] = None
+
+class BatchCommandRequest(BaseModel):
+    project_id: int
+    commands: List[str] = Field([], max_length=settings.NLP_BATCH_MAX_COMMANDS)
+    script: Optional[str] = None
+    # Si se indica, las geometrías reconocidas se guardan como elementos en esta capa
+    materialize: bool = False
+    layer_id: Optional[int] = None
+    style: Optional[ElementStyle] = None
+
+class BatchCommandResult(CommandResponse):
+    element_id: Optional[int] = None
+
+class BatchCommandResponse(BaseModel):
+    results: List[BatchCommandResult]
+    recognized: int
+    created: int
+
+# Estilo por defecto de los elementos creados por comandos (igual que en el frontend)
+DEFAULT_COMMAND_STYLE = {
+    "strokeColor": "#000000",
+    "strokeWidth": 1,
+    "lineType": "solid",
+    "fillColor": "none",
+    "fillOpacity": 0.5,
+}
+
+async def _unit_system(db: AsyncSession, user_id: int, project_id: int) -> Optional[str]:
+    """
+    Sistema de unidades del proyecto del usuario, al que se convierten las longitudes
+    """
+    query = (
+        select(Project.id, ProjectSettings.unit_system)
+        .outerjoin(ProjectSettings, ProjectSettings.project_id == Project.id)
+        .where(Project.id == project_id, Project.user_id == user_id)
+    )
+    project = (await db.execute(query)).one_or_none()
+    if project is None:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    return project.unit_system
 
 @router.post("/process", response_model=CommandResponse)
 async def process_command(
@@ -30,69 +89,138 @@ async def process_command(
     Procesa un comando en lenguaje natural
     """
     command = command_req.command.lower().strip()
+    unit_system = await _unit_system(db, current_user.id, command_req.project_id)
     
-    # Implementación básica de procesamiento de comandos
-    # En una implementación real, aquí se usaría el modelo NLP
-    
-    # Ejemplo: "crear línea de 1,1 a 3,3"
-    if "crear línea" in command:
-        try:
-            # Análisis muy simple basado en patrones
-            parts = command.split("de")[1].split("a")
-            start_coords = parts[0].strip().split(",")
-            end_coords = parts[1].strip().split(",")
-            
-            start_x, start_y = float(start_coords[0]), float(start_coords[1])
-            end_x, end_y = float(end_coords[0]), float(end_coords[1])
-            
-            return {
-                "command": command,
-                "recognized": True,
-                "action": "create_line",
-                "params": {
-                    "start": {"x": start_x, "y": start_y},
-                    "end": {"x": end_x, "y": end_y}
-                }
-            }
-        except Exception as e:
-            return {
-                "command": command,
-                "recognized": False,
-                "error": f"No se pudo interpretar el comando: {str(e)}"
-            }
+    # Análisis con el analizador de gramática precompilado (ver app.services.command_parser).
+    # Se analiza el texto original para conservar mayúsculas en el contenido de textos.
+    result = command_parser.parse(command_req.command.strip(), unit_system=unit_system)
+    source = "rules"
+    confidence = None
     
-    # Ejemplo: "crear rectángulo en 1,1 con ancho 2 y alto 3"
-    elif "crear rectángulo" in command or "crear rectangulo" in command:
+    # Si las reglas no identifican el tipo de elemento se consulta el modelo (si está cargado).
+    # Un fallo de inferencia deja la respuesta de las reglas, y solo se aceptan etiquetas
+    # registradas en el analizador (un modelo sin ajustar devuelve LABEL_0, LABEL_1...)
+    if not result.recognized and result.action is None:
         try:
-            position_part = command.split("en")[1].split("con")[0].strip()
-            position_coords = position_part.split(",")
-            x, y = float(position_coords[0]), float(position_coords[1])
-            
-            width_part = command.split("ancho")[1].split("y")[0].strip()
-            width = float(width_part)
-            
-            height_part = command.split("alto")[1].strip()
-            height = float(height_part)
-            
-            return {
-                "command": command,
-                "recognized": True,
-                "action": "create_rectangle",
-                "params": {
-                    "topLeft": {"x": x, "y": y},
-                    "width": width,
-                    "height": height
-                }
-            }
-        except Exception as e:
-            return {
-                "command": command,
-                "recognized": False,
-                "error": f"No se pudo interpretar el comando: {str(e)}"
-            }
+            intent = await intent_model.predict(command)
+        except Exception:
+            logger.exception("Error en la inferencia del modelo de intenciones")
+            intent = None
+        if (
+            intent is not None
+            and intent.action in command_parser.actions
+            and intent.confidence >= settings.NLP_MODEL_MIN_CONFIDENCE
+        ):
+            result = command_parser.parse(command_req.command.strip(), action=intent.action, unit_system=unit_system)
+            if result.action is None:
+                result.action = intent.action
+            source = "model"
+            confidence = intent.confidence
     
     return {
         "command": command,
-        "recognized": False,
-        "error": "Comando no reconocido"
-    }
\ No newline at end of file
+        "recognized": result.recognized,
+        "action": result.action,
+        "params": result.params,
+        "error": result.error,
+        "source": source,
+        "confidence": confidence,
+    }
+
+@router.post("/batch", response_model=BatchCommandResponse)
+async def process_command_batch(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+    batch_req: BatchCommandRequest,
+):
+    """
+    Procesa una lista de comandos o un guion y, opcionalmente, crea los elementos
+    resultantes en una sola transacción
+    """
+    too_many_commands = HTTPException(
+        status_code=400,
+        detail=f"El lote supera el máximo de {settings.NLP_BATCH_MAX_COMMANDS} comandos",
+    )
+    commands = list(batch_req.commands)
+    if batch_req.script:
+        # Las líneas se limitan antes de dividir; ';' puede añadir más comandos por línea
+        if batch_req.script.count("\n") >= settings.NLP_BATCH_MAX_COMMANDS:
+            raise too_many_commands
+        commands.extend(split_script(batch_req.script))
+    if len(commands) > settings.NLP_BATCH_MAX_COMMANDS:
+        raise too_many_commands
+    unit_system = await _unit_system(db, current_user.id, batch_req.project_id)
+    
+    results = []
+    for raw in commands:
+        parsed = command_parser.parse(raw.strip(), unit_system=unit_system)
+        results.append({
+            "command": raw.lower().strip(),
+            "recognized": parsed.recognized,
+            "action": parsed.action,
+            "params": parsed.params,
+            "error": parsed.error,
+            "source": "rules",
+            "element_id": None,
+        })
+    recognized = [r for r in results if r["recognized"]]
+    
+    if not batch_req.materialize or not recognized:
+        return {"results": results, "recognized": len(recognized), "created": 0}
+    
+    # Verificar proyecto y capa en una sola consulta; sin capa se usa la primera del proyecto
+    layer_query = (
+        select(Layer.id)
+        .join(Project, Project.id == Layer.project_id)
+        .where(Project.id == batch_req.project_id, Project.user_id == current_user.id)
+    )
+    if batch_req.layer_id is not None:
+        layer_query = layer_query.where(Layer.id == batch_req.layer_id)
+    layer_query = layer_query.order_by(Layer.order, Layer.id).limit(1)
+    layer_id = (await db.execute(layer_query)).scalar_one_or_none()
+    
+    if layer_id is None:
+        raise HTTPException(status_code=404, detail="Proyecto o capa no encontrados")
+    
+    style = batch_req.style.model_dump() if batch_req.style else DEFAULT_COMMAND_STYLE
+    revision = await bump_project_revision(db, batch_req.project_id)
+    rows = []
+    for r in recognized:
+        element_type = r["action"].removeprefix("create_")
+        rows.append({
+            "project_id": batch_req.project_id,
+            "layer_id": layer_id,
+            "type": element_type,
+            "geometry": r["params"],
+            "style": style,
+            "selected": False,
+            "locked": False,
+            "metadata": {"source": "nlp"},
+            "revision": revision,
+            **bbox_values(element_type, r["params"]),
+        })
+    
+    result = await db.execute(
+        insert(Element).returning(Element.id, sort_by_parameter_order=True), rows
+    )
+    ids = list(result.scalars().all())
+    await db.commit()
+    
+    changes = []
+    for r, row, element_id in zip(recognized, rows, ids):
+        r["element_id"] = element_id
+        data = {k: v for k, v in row.items() if k not in ("min_x", "min_y", "max_x", "max_y")}
+        changes.append(make_change("element", "upsert", element_id, revision, {"id": element_id, **data}))
+    change_hub.publish(batch_req.project_id, changes)
+    
+    return {"results": results, "recognized": len(recognized), "created": len(ids)}
+
+@router.get("/model-stats")
+async def get_model_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+):
+    """
+    Estado del modelo de intenciones, tamaño medio de lote y caché
+    """
+    return intent_model.stats()
\ No newline at end of file
@@ -1,20 +1,34 @@
-from typing import Any, List
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request, Response, WebSocket, WebSocketDisconnect, status
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.api import deps
+from app.core.negotiation import MSGPACK_MEDIA_TYPE, dump_msgpack, negotiated_response, negotiated_stream, wants_msgpack
+from app.models.element import Element
+from app.models.layer import Layer
+from app.models.tombstone import Tombstone
 from app.models.project import Project
 from app.models.project_setting import ProjectSettings
-from app.db.session import get_db
+from app.db.session import async_session, get_db, get_read_db, read_session
+from app.services.analytics import project_stats
+from app.services.change_hub import change_hub
+from app.services.lod import LevelOfDetail, geometry_simplifier, level_of_detail, visible_size_filter
+from app.services.tiles import MAX_ZOOM, MIN_ZOOM, TileKey, tile_service
+from app.utils.serialization import element_list_to_binary, element_to_binary, element_to_json_dict
 
 router = APIRouter()
 
+# Filas leídas del cursor del servidor por cada bloque enviado
+EXPORT_CHUNK_SIZE = 500
+
 @router.get("/", response_model=List[schemas.Project])
 async def get_projects(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100,
@@ -64,31 +78,357 @@ async def create_project(
 @router.get("/{id}", response_model=schemas.ProjectWithSettings)
 async def get_project(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(deps.get_current_user),
     id: int,
 ) -> Any:
     """
     Obtener proyecto por ID
     """
-    query = select(Project).where(Project.id == id, Project.user_id == current_user.id)
+    # Proyecto y configuración en una sola consulta
+    query = (
+        select(Project)
+        .options(joinedload(Project.settings))
+        .where(Project.id == id, Project.user_id == current_user.id)
+    )
     result = await db.execute(query)
     project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(status_code=404, detail="Proyecto no encontrado")
     
-    # Obtener configuración
-    settings_query = select(ProjectSettings).where(ProjectSettings.project_id == id)
-    settings_result = await db.execute(settings_query)
-    settings = settings_result.scalar_one_or_none()
+    # La consulta ya autorizó el acceso: se aprovecha para la caché de permisos
+    deps.project_access_cache.set((current_user.id, id, None), True)
+    settings = project.settings
     
     return {
         "id": project.id,
         "name": project.name,
         "description": project.description,
         "user_id": project.user_id,
+        "revision": project.revision,
         "created_at": project.created_at,
         "updated_at": project.updated_at,
         "settings": settings
-    }
\ No newline at end of file
+    }
+
+
+def _project_etag(project: Project, lod: Optional[LevelOfDetail] = None) -> str:
+    # Cada nivel de detalle es una representación distinta del mismo estado
+    if lod is not None:
+        return f'"{project.id}-{project.revision}-lod{lod.key}"'
+    return f'"{project.id}-{project.revision}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comprueba si alguna de las etiquetas de If-None-Match coincide con el ETag
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/{id}/snapshot", response_model=schemas.ProjectSnapshot)
+async def get_project_snapshot(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
+    tolerance: Optional[float] = None,
+    zoom: Optional[float] = None,
+) -> Any:
+    """
+    Obtener proyecto, configuración, capas y elementos en una sola respuesta.
+    Responde 304 si If-None-Match coincide con la revisión actual.
+    Admite MessagePack (Accept) y compresión (Accept-Encoding), y un nivel de
+    detalle reducido con tolerance o zoom como el listado de elementos.
+    """
+    try:
+        lod = level_of_detail(tolerance, zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Proyecto y configuración en una sola consulta
+    query = (
+        select(Project)
+        .options(joinedload(Project.settings))
+        .where(Project.id == id, Project.user_id == current_user.id)
+    )
+    result = await db.execute(query)
+    project = result.scalar_one_or_none()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    deps.project_access_cache.set((current_user.id, id, None), True)
+    etag = _project_etag(project, lod)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    layers_result = await db.execute(
+        select(Layer).where(Layer.project_id == id).order_by(Layer.order, Layer.id)
+    )
+    elements_query = select(*Element.__table__.c).where(Element.project_id == id)
+    if lod is not None:
+        elements_query = elements_query.where(visible_size_filter(lod))
+    elements_result = await db.execute(elements_query.order_by(Element.id))
+    
+    snapshot = schemas.ProjectSnapshot.model_validate(
+        {
+            "project": {
+                "id": project.id,
+                "name": project.name,
+                "description": project.description,
+                "user_id": project.user_id,
+                "revision": project.revision,
+                "created_at": project.created_at,
+                "updated_at": project.updated_at,
+                "settings": project.settings,
+            },
+            "layers": layers_result.scalars().all(),
+            "elements": [],
+            "revision": project.revision,
+        },
+        from_attributes=True,
+    ).model_dump(mode="json")
+    # Los elementos se serializan desde las filas sin pasar por el esquema
+    rows = elements_result.mappings().all()
+    if lod is not None:
+        rows = [geometry_simplifier.simplify_row(row, lod) for row in rows]
+    snapshot["elements"] = [element_to_json_dict(row) for row in rows]
+    return negotiated_response(
+        request.headers, snapshot, "snapshot", etag=etag, to_binary=element_list_to_binary
+    )
+
+
+@router.get("/{id}/tiles/{z}/{x}/{y}")
+async def get_project_tile(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    z: int = Path(..., ge=MIN_ZOOM, le=MAX_ZOOM),
+    x: int,
+    y: int,
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Tesela vectorial (z, x, y) del proyecto: elementos recortados a la tesela,
+    simplificados y con coordenadas enteras relativas a su origen.
+    El ETag solo cambia cuando algún cambio toca la tesela.
+    """
+    query = select(Project.revision).where(Project.id == id, Project.user_id == current_user.id)
+    revision = (await db.execute(query)).scalar_one_or_none()
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    tile = await tile_service.get(db, TileKey(id, z, x, y), revision)
+    etag = f'"{id}-{z}-{x}-{y}-{tile.content_revision}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return negotiated_response(request.headers, tile.payload, "tiles", etag=etag)
+
+
+@router.get("/{id}/stats")
+async def get_project_stats(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+) -> Any:
+    """
+    Mediciones del proyecto para cómputos: número de elementos, longitud de trazos
+    abiertos, perímetro y área de figuras cerradas, por capa y por tipo, y extensión total.
+    Se recalculan solo cuando cambia la revisión del proyecto.
+    """
+    query = (
+        select(Project.revision, ProjectSettings.unit_system)
+        .outerjoin(ProjectSettings, ProjectSettings.project_id == Project.id)
+        .where(Project.id == id, Project.user_id == current_user.id)
+    )
+    project = (await db.execute(query)).one_or_none()
+    if project is None:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    stats = await project_stats.get(db, id, project.revision)
+    return {**stats, "unit_system": project.unit_system}
+
+
+@router.get("/{id}/changes", response_model=schemas.ProjectChanges)
+async def get_project_changes(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    since: int = 0,
+) -> Any:
+    """
+    Obtener capas y elementos creados, modificados o eliminados después de la revisión since
+    """
+    query = select(Project.revision).where(Project.id == id, Project.user_id == current_user.id)
+    result = await db.execute(query)
+    revision = result.scalar_one_or_none()
+    
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    if since >= revision:
+        return {
+            "since": since,
+            "revision": revision,
+            "layers": [],
+            "elements": [],
+            "deleted_layers": [],
+            "deleted_elements": [],
+        }
+    
+    layers_result = await db.execute(
+        select(Layer).where(Layer.project_id == id, Layer.revision > since).order_by(Layer.id)
+    )
+    elements_result = await db.execute(
+        select(*Element.__table__.c)
+        .where(Element.project_id == id, Element.revision > since)
+        .order_by(Element.id)
+    )
+    tombstones_result = await db.execute(
+        select(Tombstone.entity_type, Tombstone.entity_id)
+        .where(Tombstone.project_id == id, Tombstone.revision > since)
+        .order_by(Tombstone.revision)
+    )
+    tombstones = tombstones_result.all()
+    
+    return {
+        "since": since,
+        "revision": revision,
+        "layers": layers_result.scalars().all(),
+        "elements": [dict(row) for row in elements_result.mappings()],
+        "deleted_layers": [t.entity_id for t in tombstones if t.entity_type == "layer"],
+        "deleted_elements": [t.entity_id for t in tombstones if t.entity_type == "element"],
+    }
+
+
+async def _stream_elements(query, as_msgpack: bool = False) -> AsyncIterator[bytes]:
+    """
+    Recorre la consulta con un cursor del servidor y emite bloques NDJSON
+    o una secuencia de objetos MessagePack
+    """
+    # Sesión propia: la de la dependencia se cierra antes de terminar el streaming
+    async with read_session() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for rows in result.mappings().partitions(EXPORT_CHUNK_SIZE):
+            if as_msgpack:
+                yield b"".join(dump_msgpack(element_to_binary(element_to_json_dict(row))) for row in rows)
+            else:
+                yield b"".join(
+                    schemas.Element.model_validate(dict(row)).model_dump_json().encode() + b"\n"
+                    for row in rows
+                )
+
+
+@router.get("/{id}/export")
+async def export_project_elements(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    request: Request,
+    layer_id: int = None,
+    element_type: str = None,
+) -> Any:
+    """
+    Exportar los elementos de un proyecto como JSON delimitado por líneas (NDJSON),
+    o como secuencia de objetos MessagePack si Accept lo pide
+    """
+    # Permisos en el primario (la réplica puede ir por detrás); los datos, de la réplica
+    await deps.authorize_project(primary_db, current_user.id, id)
+    
+    # Columnas en lugar de entidades ORM para no acumular objetos en la sesión
+    export_query = select(*Element.__table__.c).where(Element.project_id == id)
+    if layer_id:
+        export_query = export_query.where(Element.layer_id == layer_id)
+    if element_type:
+        export_query = export_query.where(Element.type == element_type)
+    export_query = export_query.order_by(Element.id)
+    
+    as_msgpack = wants_msgpack(request.headers.get("accept"))
+    return await negotiated_stream(
+        request.headers,
+        _stream_elements(export_query, as_msgpack),
+        "export",
+        MSGPACK_MEDIA_TYPE if as_msgpack else "application/x-ndjson",
+    )
+
+
+@router.websocket("/{id}/ws")
+async def project_changes_ws(
+    websocket: WebSocket,
+    id: int,
+):
+    """
+    Canal de cambios en tiempo real de un proyecto.
+    Autenticado con el mismo JWT que las rutas HTTP, enviado como primer mensaje
+    {"type": "auth", "token": "..."} (no en la URL, que acaba en los registros de acceso).
+    """
+    await websocket.accept()
+    token = await deps.receive_websocket_token(websocket)
+    if token is None:
+        return
+    
+    # Suscripción antes de leer la revisión: un cambio publicado entre la lectura y la
+    # suscripción se perdería. Los que lleguen con revisión <= hello ya están incluidos.
+    subscription = change_hub.subscribe(id)
+    # Sesión corta en el primario (la réplica puede ir por detrás) solo para autenticar:
+    # la conexión no retiene recursos de la base de datos
+    try:
+        async with async_session() as db:
+            try:
+                user = await deps.authenticate_token(db, token)
+            except HTTPException:
+                user = None
+            revision = None
+            if user is not None:
+                query = select(Project.revision).where(Project.id == id, Project.user_id == user.id)
+                revision = (await db.execute(query)).scalar_one_or_none()
+    except BaseException:
+        change_hub.unsubscribe(subscription)
+        raise
+    
+    if revision is None:
+        change_hub.unsubscribe(subscription)
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    async def send_changes() -> None:
+        await websocket.send_json({"type": "hello", "project_id": id, "revision": revision})
+        while True:
+            batch = await subscription.next_batch(change_hub.coalesce_window)
+            if batch is None:
+                # El cliente no siguió el ritmo: debe pedir /changes desde su última revisión
+                await websocket.send_json({"type": "resync", "project_id": id})
+                continue
+            await websocket.send_json({
+                "type": "changes",
+                "project_id": id,
+                "revision": max(change["revision"] for change in batch),
+                "changes": batch,
+            })
+    
+    sender = asyncio.create_task(send_changes())
+    try:
+        # Se leen (e ignoran) los mensajes del cliente para detectar la desconexión
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        change_hub.unsubscribe(subscription)
\ No newline at end of file
@@ -0,0 +1,165 @@
+from typing import Any, List, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.db.session import get_read_db
+from app.models.layer import Layer
+from app.models.project import Project
+from app.models.project_setting import ProjectSettings
+from app.services.spatial_index import ProjectSpatialIndex, spatial_indexes
+
+router = APIRouter()
+
+SNAP_KINDS = {"endpoint", "midpoint", "center", "quadrant", "insertion"}
+
+
+class NearestVertexResponse(BaseModel):
+    found: bool
+    x: Optional[float] = None
+    y: Optional[float] = None
+    kind: Optional[str] = None
+    element_id: Optional[int] = None
+    distance: Optional[float] = None
+
+
+class HitResult(BaseModel):
+    element_id: int
+    layer_id: int
+    type: str
+    distance: float
+
+
+class HitTestResponse(BaseModel):
+    hits: List[HitResult]
+
+
+class SnapResponse(BaseModel):
+    x: float
+    y: float
+    # Origen del punto: vertex (geometría), grid (rejilla) o none (sin ajuste)
+    source: str
+    kind: Optional[str] = None
+    element_id: Optional[int] = None
+
+
+async def _project_index(db: AsyncSession, user_id: int, project_id: int) -> Any:
+    """
+    Índice espacial al día del proyecto junto con su configuración de rejilla
+    """
+    query = (
+        select(Project.revision, ProjectSettings.grid_spacing, ProjectSettings.snap_to_grid)
+        .outerjoin(ProjectSettings, ProjectSettings.project_id == Project.id)
+        .where(Project.id == project_id, Project.user_id == user_id)
+    )
+    project = (await db.execute(query)).one_or_none()
+    if project is None:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    index = await spatial_indexes.get(db, project_id, project.revision)
+    return project, index
+
+
+async def _hidden_layers(db: AsyncSession, project_id: int, include_hidden: bool) -> Set[int]:
+    if include_hidden:
+        return set()
+    result = await db.execute(
+        select(Layer.id).where(Layer.project_id == project_id, Layer.visible.is_(False))
+    )
+    return set(result.scalars())
+
+
+def _parse_kinds(kinds: Optional[str]) -> Optional[Set[str]]:
+    if not kinds:
+        return None
+    selected = {kind.strip() for kind in kinds.split(",") if kind.strip()}
+    unknown = selected - SNAP_KINDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tipos de punto no válidos: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def _nearest(
+    index: ProjectSpatialIndex, x: float, y: float, tolerance: float, kinds: Optional[Set[str]], hidden: Set[int]
+) -> NearestVertexResponse:
+    hit = index.nearest_vertex(x, y, tolerance, kinds, hidden)
+    if hit is None:
+        return NearestVertexResponse(found=False)
+    return NearestVertexResponse(
+        found=True, x=hit.x, y=hit.y, kind=hit.kind, element_id=hit.element_id, distance=hit.distance
+    )
+
+
+@router.get("/{id}/nearest-vertex", response_model=NearestVertexResponse)
+async def nearest_vertex(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    x: float,
+    y: float,
+    tolerance: float = Query(1.0, gt=0),
+    kinds: Optional[str] = None,
+    include_hidden: bool = False,
+) -> Any:
+    """
+    Punto notable (extremo, punto medio, centro, cuadrante o inserción) más cercano
+    a (x, y) dentro de la tolerancia. kinds limita los tipos (separados por comas).
+    """
+    selected_kinds = _parse_kinds(kinds)
+    _, index = await _project_index(db, current_user.id, id)
+    hidden = await _hidden_layers(db, id, include_hidden)
+    return _nearest(index, x, y, tolerance, selected_kinds, hidden)
+
+
+@router.get("/{id}/hit-test", response_model=HitTestResponse)
+async def hit_test(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    x: float,
+    y: float,
+    tolerance: float = Query(1.0, gt=0),
+    limit: int = Query(10, ge=1, le=100),
+    include_hidden: bool = False,
+) -> Any:
+    """
+    Elementos bajo el cursor: su trazo pasa a menos de la tolerancia de (x, y),
+    ordenados del más cercano al más lejano
+    """
+    _, index = await _project_index(db, current_user.id, id)
+    hidden = await _hidden_layers(db, id, include_hidden)
+    hits = index.hit_test(x, y, tolerance, limit, hidden)
+    return {"hits": [HitResult(**vars(hit)) for hit in hits]}
+
+
+@router.get("/{id}/snap", response_model=SnapResponse)
+async def snap_point(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(deps.get_current_user),
+    id: int,
+    x: float,
+    y: float,
+    tolerance: float = Query(1.0, gt=0),
+    kinds: Optional[str] = None,
+) -> Any:
+    """
+    Ajustar (x, y): primero a la geometría cercana y, si no hay ninguna dentro de la
+    tolerancia, a la rejilla del proyecto cuando snap_to_grid está activo
+    """
+    selected_kinds = _parse_kinds(kinds)
+    project, index = await _project_index(db, current_user.id, id)
+    hidden = await _hidden_layers(db, id, False)
+
+    nearest = _nearest(index, x, y, tolerance, selected_kinds, hidden)
+    if nearest.found:
+        return SnapResponse(x=nearest.x, y=nearest.y, source="vertex", kind=nearest.kind, element_id=nearest.element_id)
+
+    spacing = project.grid_spacing
+    if project.snap_to_grid and spacing and spacing > 0:
+        return SnapResponse(x=round(x / spacing) * spacing, y=round(y / spacing) * spacing, source="grid")
+    return SnapResponse(x=x, y=y, source="none")
@@ -1,27 +1,73 @@
-from typing import Generator, Optional
+import asyncio
+import secrets
+import time
+from typing import Any, Dict, Generator, Iterable, Optional, Tuple
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import JWTError
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.db.session import get_db
+from app.models.layer import Layer
+from app.models.project import Project
 from app.models.user import User
 
 # Configuración OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/access-token")
 
+# Cachés de autenticación: token -> id de usuario, id de usuario -> usuario activo
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
+# Caché de permisos: (user_id, project_id, layer_id) -> True si el acceso está autorizado
+project_access_cache = TTLCache(
+    settings.PROJECT_ACCESS_CACHE_MAX_SIZE, settings.PROJECT_ACCESS_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_user_cache(user_id: int) -> None:
     """
-    Valida el token y obtiene el usuario actual
+    Elimina un usuario de la caché de autenticación
+    """
+    user_cache.pop(user_id)
+    token_cache.discard_where(lambda _, cached_id: cached_id == user_id)
+
+
+def auth_cache_stats() -> Dict[str, Any]:
+    """
+    Contadores de aciertos y fallos de las cachés de autenticación
+    """
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_user_on_update(mapper, connection, target: User) -> None:
+    # Un cambio de estado o de contraseña debe revalidarse contra la base de datos
+    state = inspect(target)
+    if (
+        state.attrs.is_active.history.has_changes()
+        or state.attrs.hashed_password.history.has_changes()
+        or state.attrs.is_superuser.history.has_changes()
+    ):
+        invalidate_user_cache(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_delete(mapper, connection, target: User) -> None:
+    invalidate_user_cache(target.id)
+
+
+async def authenticate_token(db: AsyncSession, token: str) -> User:
+    """
+    Valida un token JWT y devuelve el usuario activo asociado.
+    Compartido por las rutas HTTP y los WebSockets.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,21 +75,32 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # Decodificar el token JWT
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        user_id: Optional[int] = payload.get("sub")
-        if user_id is None:
+    user_id: Optional[int] = token_cache.get(token)
+    if user_id is None:
+        try:
+            # Decodificar el token JWT
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=["HS256"]
+            )
+            user_id = payload.get("sub")
+            if user_id is None:
+                raise credentials_exception
+            token_data = schemas.TokenPayload(sub=user_id)
+        except JWTError:
             raise credentials_exception
-        token_data = schemas.TokenPayload(sub=user_id)
-    except JWTError:
-        raise credentials_exception
+        user_id = token_data.sub
+        # El token no puede seguir en caché más allá de su expiración
+        exp = payload.get("exp")
+        ttl = exp - time.time() if exp else None
+        token_cache.set(token, user_id, ttl)
+    
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
     
     # Obtener el usuario desde la base de datos
-    query = "SELECT * FROM users WHERE id = :id"
-    result = await db.execute(query, {"id": token_data.sub})
+    query = select(User).where(User.id == user_id)
+    result = await db.execute(query)
     user = result.scalar_one_or_none()
     
     if user is None:
@@ -54,9 +111,44 @@ async def get_current_user(
             detail="Usuario inactivo",
         )
     
+    # Solo se guardan usuarios activos, desligados de la sesión de la petición
+    db.expunge(user)
+    user_cache.set(user_id, user)
+    
     return user
 
 
+async def receive_websocket_token(websocket: WebSocket) -> Optional[str]:
+    """
+    Token JWT del primer mensaje de un WebSocket ya aceptado: {"type": "auth", "token": "..."}.
+    El token no viaja en la URL para no quedar en los registros de acceso.
+    Si no llega a tiempo o el mensaje no es válido cierra la conexión y devuelve None.
+    """
+    try:
+        message = await asyncio.wait_for(
+            websocket.receive_json(), settings.REALTIME_AUTH_TIMEOUT_SECONDS
+        )
+    except WebSocketDisconnect:
+        return None
+    except (asyncio.TimeoutError, ValueError):
+        message = None
+    token = message.get("token") if isinstance(message, dict) and message.get("type") == "auth" else None
+    if not isinstance(token, str) or not token:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return None
+    return token
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """
+    Valida el token y obtiene el usuario actual
+    """
+    return await authenticate_token(db, token)
+
+
 async def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -68,4 +160,140 @@ async def get_current_active_superuser(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tiene suficientes permisos",
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def get_metrics_access(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> None:
+    """
+    Acceso a /metrics: token estático METRICS_TOKEN (para el scraper) o JWT de superusuario
+    """
+    if settings.METRICS_TOKEN and secrets.compare_digest(token, settings.METRICS_TOKEN):
+        return
+    await get_current_active_superuser(await authenticate_token(db, token))
+
+
+def invalidate_project_access(project_id: Optional[int] = None, layer_id: Optional[int] = None) -> None:
+    """
+    Elimina de la caché de permisos las entradas de un proyecto o de una capa
+    """
+    project_access_cache.discard_where(
+        lambda key, _: (project_id is not None and key[1] == project_id)
+        or (layer_id is not None and key[2] == layer_id)
+    )
+
+
+@event.listens_for(Project, "after_update")
+def _invalidate_project_on_update(mapper, connection, target: Project) -> None:
+    # Cambio de propietario
+    if inspect(target).attrs.user_id.history.has_changes():
+        invalidate_project_access(project_id=target.id)
+
+
+@event.listens_for(Project, "after_delete")
+def _invalidate_project_on_delete(mapper, connection, target: Project) -> None:
+    invalidate_project_access(project_id=target.id)
+
+
+@event.listens_for(Layer, "after_update")
+def _invalidate_layer_on_update(mapper, connection, target: Layer) -> None:
+    # Capa movida a otro proyecto
+    if inspect(target).attrs.project_id.history.has_changes():
+        invalidate_project_access(layer_id=target.id)
+
+
+@event.listens_for(Layer, "after_delete")
+def _invalidate_layer_on_delete(mapper, connection, target: Layer) -> None:
+    invalidate_project_access(layer_id=target.id)
+
+
+async def authorize_project(
+    db: AsyncSession, user_id: int, project_id: int, layer_id: Optional[int] = None
+) -> None:
+    """
+    Verifica que el proyecto (y opcionalmente la capa dentro de él) pertenezca al usuario.
+    Una sola consulta como máximo; los accesos autorizados se guardan en caché.
+    """
+    key = (user_id, project_id, layer_id)
+    if project_access_cache.get(key):
+        return
+    
+    if layer_id is None:
+        query = select(Project.id).where(Project.id == project_id, Project.user_id == user_id)
+    else:
+        query = (
+            select(Layer.id)
+            .join(Project, Project.id == Layer.project_id)
+            .where(Layer.id == layer_id, Project.id == project_id, Project.user_id == user_id)
+        )
+    result = await db.execute(query)
+    if result.scalar_one_or_none() is None:
+        if layer_id is not None:
+            # Distinguir proyecto inexistente de capa inexistente (solo en el camino de error)
+            await authorize_project(db, user_id, project_id)
+            raise HTTPException(status_code=404, detail="Capa no encontrada")
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    project_access_cache.set(key, True)
+    if layer_id is not None:
+        project_access_cache.set((user_id, project_id, None), True)
+
+
+async def authorize_projects(
+    db: AsyncSession, user_id: int, project_ids: Iterable[int]
+) -> None:
+    """
+    Versión por lotes de authorize_project: una consulta para todos los proyectos no cacheados
+    """
+    pending = {p for p in project_ids if not project_access_cache.get((user_id, p, None))}
+    if not pending:
+        return
+    query = select(Project.id).where(Project.id.in_(pending), Project.user_id == user_id)
+    result = await db.execute(query)
+    found = set(result.scalars().all())
+    for project_id in found:
+        project_access_cache.set((user_id, project_id, None), True)
+    if found != pending:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+
+async def authorize_layers(
+    db: AsyncSession, user_id: int, pairs: Iterable[Tuple[int, int]]
+) -> None:
+    """
+    Verifica por lotes pares (layer_id, project_id) del usuario con una sola consulta
+    """
+    pending = {
+        (layer_id, project_id)
+        for layer_id, project_id in pairs
+        if not project_access_cache.get((user_id, project_id, layer_id))
+    }
+    if not pending:
+        return
+    query = (
+        select(Layer.id, Layer.project_id)
+        .join(Project, Project.id == Layer.project_id)
+        .where(Layer.id.in_({layer_id for layer_id, _ in pending}), Project.user_id == user_id)
+    )
+    result = await db.execute(query)
+    found = set(result.tuples().all())
+    for layer_id, project_id in found & pending:
+        project_access_cache.set((user_id, project_id, layer_id), True)
+    if not pending <= found:
+        raise HTTPException(status_code=404, detail="Capa no encontrada")
+
+
+async def get_project_access(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> int:
+    """
+    Dependencia para rutas con parámetro project_id: autoriza el proyecto una vez por petición.
+    La comprobación va al primario (la réplica puede no tener aún un proyecto recién creado);
+    la ruta puede leer sus datos de la réplica.
+    """
+    await authorize_project(db, current_user.id, project_id)
+    return project_id
\ No newline at end of file
@@ -10,6 +10,79 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutos * 24 horas * 8 días = 8 días
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Caché en memoria de tokens decodificados y usuarios autenticados
+    AUTH_CACHE_TTL_SECONDS: float = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    # Caché de permisos (usuario, proyecto, capa); TTL corto por ser por proceso
+    PROJECT_ACCESS_CACHE_TTL_SECONDS: float = 30
+    PROJECT_ACCESS_CACHE_MAX_SIZE: int = 50000
+    # Pool dedicado para bcrypt: hilos y máximo de operaciones en cola
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Canal de cambios en tiempo real (WebSocket)
+    REALTIME_COALESCE_MS: int = 50  # ventana para agrupar actualizaciones del mismo elemento
+    REALTIME_MAX_PENDING: int = 1000  # cambios pendientes por cliente antes de pedir resincronización
+    REALTIME_AUTH_TIMEOUT_SECONDS: float = 10  # espera del mensaje de autenticación del WebSocket
+    # Modelo de intenciones (transformers) detrás del analizador por reglas
+    NLP_MODEL_ENABLED: bool = False
+    NLP_MODEL_NAME: str = "dccuchile/bert-base-spanish-wwm-uncased"  # ruta o id de un modelo de clasificación ajustado
+    NLP_MODEL_QUANTIZE: bool = True  # cuantización dinámica int8 en CPU
+    NLP_MODEL_THREADS: int = 2
+    NLP_MODEL_MAX_BATCH: int = 16
+    NLP_MODEL_MAX_WAIT_MS: int = 10
+    NLP_MODEL_MIN_CONFIDENCE: float = 0.6
+    NLP_INTENT_CACHE_SIZE: int = 4096
+    NLP_INTENT_CACHE_TTL_SECONDS: float = 3600
+    NLP_BATCH_MAX_COMMANDS: int = 1000  # comandos por petición a /nlp/batch (lista más guion)
+    # Instrumentación de consultas SQL por petición
+    SQL_METRICS_ENABLED: bool = True
+    SQL_QUERY_BUDGET: int = 20  # consultas por petición antes de avisar
+    SQL_REPEAT_THRESHOLD: int = 10  # repeticiones de una misma consulta (posible N+1)
+    # /metrics exige este token (Authorization: Bearer) o el JWT de un superusuario
+    METRICS_TOKEN: Optional[str] = None
+    # Perfilado bajo demanda (solo superusuarios, cabecera PROFILING_HEADER)
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_DIR: str = "/tmp/cad-nlp-profiles"
+    PROFILING_MAX_FILES: int = 50
+    # Escritura agrupada (group commit) de elementos creados de forma interactiva
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_DELAY_MS: float = 5
+    GROUP_COMMIT_MAX_BATCH: int = 200
+    # Compresión de respuestas negociada por ruta (bytes mínimos; negativo la desactiva)
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_DEFAULT_MIN_BYTES: int = 1024
+    RESPONSE_COMPRESSION_MIN_BYTES: Dict[str, int] = {"elements": 1024, "snapshot": 1024, "export": 4096, "tiles": 1024}
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    # Índices espaciales en memoria (snap y selección), acotados por entradas indexadas
+    SPATIAL_INDEX_MAX_WEIGHT: int = 2_000_000
+    SPATIAL_INDEX_MAX_PROJECTS: int = 64
+    SPATIAL_INDEX_MAX_CELLS_PER_ELEMENT: int = 64
+    SPATIAL_INDEX_DEFAULT_CELL_SIZE: float = 10.0
+    # Nivel de detalle (tolerance/zoom) en listados de elementos y snapshots
+    LOD_TOLERANCE_PIXELS: float = 0.5  # desviación máxima de la simplificación, en píxeles
+    LOD_MIN_SIZE_PIXELS: float = 1.0  # elementos más pequeños se omiten
+    LOD_CACHE_SIZE: int = 100000
+    LOD_CACHE_TTL_SECONDS: float = 3600
+    # Teselas vectoriales: lado de la tesela a zoom 0 (unidades del dibujo) y resolución
+    TILE_ZOOM0_SIZE: float = 4096.0
+    TILE_EXTENT: int = 4096
+    TILE_BUFFER: int = 64  # margen de recorte, en unidades de tesela
+    TILE_MAX_ELEMENTS: int = 20000
+    TILE_MIN_ZOOM: int = -8
+    TILE_MAX_ZOOM: int = 24
+    TILE_CACHE_SIZE: int = 5000
+    TILE_CACHE_TTL_SECONDS: float = 3600
+    TILE_CACHE_DIR: Optional[str] = "/tmp/cad-nlp-tiles"  # vacío para desactivar la caché en disco
+    TILE_CACHE_DIR_MAX_BYTES: int = 1024 * 1024 * 1024  # se borran las teselas menos usadas al superarlo
+    # Mediciones de proyecto (/projects/{id}/stats), en caché hasta cambiar la revisión
+    PROJECT_STATS_CACHE_SIZE: int = 256
+    PROJECT_STATS_CACHE_TTL_SECONDS: float = 3600
+    # Transformaciones masivas: elementos seleccionados y filas nuevas por petición
+    TRANSFORM_MAX_ELEMENTS: int = 20000
+    TRANSFORM_MAX_COPIES: int = 50000
     SERVER_NAME: str = "cad-nlp-api"
     SERVER_HOST: AnyHttpUrl = "http://localhost"
     
@@ -46,6 +119,18 @@ class Settings(BaseSettings):
             path=f"{values.data.get('POSTGRES_DB') or ''}",
         )
 
+    # Réplica de solo lectura opcional (cualquier URL async, p.ej. sqlite+aiosqlite en local)
+    SQLALCHEMY_REPLICA_URI: Optional[str] = None
+
+    # Pool de conexiones y opciones del motor
+    SQLALCHEMY_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # segundos
+    DB_POOL_PRE_PING: bool = True
+    # Caché de sentencias preparadas de asyncpg (0 para desactivar, p.ej. con pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
     class Config:
         case_sensitive = True
         env_file = ".env"
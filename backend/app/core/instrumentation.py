@@ -0,0 +1,198 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Awaitable, Coroutine, Dict, List, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+T = TypeVar("T")
+
+
+class RequestStats:
+    """
+    Consultas SQL y tiempos acumulados durante una petición
+    """
+
+    __slots__ = ("queries", "db_seconds", "rows_affected", "statements")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows_affected = 0
+        self.statements: Counter = Counter()
+
+
+class RouteMetrics:
+    """
+    Agregados por ruta para el endpoint /metrics
+    """
+
+    __slots__ = ("requests", "queries", "db_seconds", "rows_affected", "handler_seconds", "max_queries", "over_budget")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows_affected = 0
+        self.handler_seconds = 0.0
+        self.max_queries = 0
+        self.over_budget = 0
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_sql_stats", default=None)
+route_metrics: Dict[str, RouteMetrics] = {}
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+async def _untracked(coro: Awaitable[T]) -> T:
+    _current_stats.set(None)
+    return await coro
+
+
+def untracked(coro: Awaitable[T]) -> Coroutine[Any, Any, T]:
+    """
+    Envuelve la corrutina de una tarea de larga duración para que no herede las
+    estadísticas de la petición que la crea (su SQL no es de esa petición)
+    """
+    return _untracked(coro)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Registra eventos del motor para contar consultas, filas modificadas y tiempo de base de datos
+    """
+    sync_engine = engine.sync_engine
+
+    # El inicio se guarda en el contexto de ejecución y no en la conexión: si la
+    # sentencia falla no queda un valor huérfano en una conexión del pool
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._sql_stats_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        start = getattr(context, "_sql_stats_start", None)
+        if stats is None or start is None:
+            return
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+        # rowcount solo es fiable en INSERT/UPDATE/DELETE (en SELECT los drivers
+        # devuelven -1 o un valor sin sentido), así que solo se cuentan filas modificadas
+        if (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+            stats.rows_affected += cursor.rowcount
+        stats.statements[statement] += 1
+
+
+def _route_name(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # Sin ruta resuelta se agrupan los ids numéricos para no crear una serie por recurso
+    return _ID_SEGMENT_RE.sub("/{id}", scope.get("path", ""))
+
+
+class QueryMetricsMiddleware:
+    """
+    Middleware ASGI que mide consultas SQL, tiempo de base de datos y del manejador
+    por petición, añade cabeceras Server-Timing y avisa al superar el presupuesto
+    """
+
+    def __init__(self, app, query_budget: int, repeat_threshold: int):
+        self.app = app
+        self.query_budget = query_budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        handler_seconds: List[float] = []
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                handler_seconds.append(elapsed)
+                server_timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"app;dur={elapsed * 1000:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._record(scope, stats, handler_seconds[0] if handler_seconds else time.perf_counter() - start)
+
+    def _record(self, scope: Dict[str, Any], stats: RequestStats, handler_seconds: float) -> None:
+        route = f'{scope.get("method", "")} {_route_name(scope)}'
+        metrics = route_metrics.setdefault(route, RouteMetrics())
+        metrics.requests += 1
+        metrics.queries += stats.queries
+        metrics.db_seconds += stats.db_seconds
+        metrics.rows_affected += stats.rows_affected
+        metrics.handler_seconds += handler_seconds
+        metrics.max_queries = max(metrics.max_queries, stats.queries)
+
+        if stats.queries > self.query_budget:
+            metrics.over_budget += 1
+            logger.warning(
+                "%s ejecutó %d consultas (presupuesto %d, %.1f ms en base de datos)",
+                route, stats.queries, self.query_budget, stats.db_seconds * 1000,
+            )
+        # Posible N+1: la misma sentencia repetida muchas veces en una petición
+        if stats.statements:
+            statement, repeats = stats.statements.most_common(1)[0]
+            if repeats >= self.repeat_threshold:
+                logger.warning(
+                    "%s repitió %d veces la misma consulta (posible N+1): %s",
+                    route, repeats, " ".join(statement.split())[:200],
+                )
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """
+    Métricas por ruta en formato de texto de Prometheus
+    """
+    series = [
+        ("http_requests_total", "counter", "Peticiones atendidas", lambda m: m.requests),
+        ("http_sql_queries_total", "counter", "Consultas SQL ejecutadas", lambda m: m.queries),
+        ("http_sql_seconds_total", "counter", "Tiempo en base de datos", lambda m: m.db_seconds),
+        ("http_sql_rows_affected_total", "counter", "Filas insertadas, actualizadas o eliminadas", lambda m: m.rows_affected),
+        ("http_handler_seconds_total", "counter", "Tiempo hasta el inicio de la respuesta", lambda m: m.handler_seconds),
+        ("http_sql_queries_max", "gauge", "Máximo de consultas en una petición", lambda m: m.max_queries),
+        ("http_sql_over_budget_total", "counter", "Peticiones que superaron el presupuesto de consultas", lambda m: m.over_budget),
+    ]
+    lines: List[str] = []
+    for name, kind, help_text, getter in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for route, metrics in sorted(route_metrics.items()):
+            method, _, path = route.partition(" ")
+            labels = f'method="{_escape_label(method)}",route="{_escape_label(path)}"'
+            lines.append(f"{name}{{{labels}}} {getter(metrics)}")
+    return "\n".join(lines) + "\n"
\ No newline at end of file
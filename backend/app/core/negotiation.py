@@ -0,0 +1,227 @@
+import json
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+from app.core.config import settings
+
+# Dependencias opcionales: sin ellas se sirve JSON y solo gzip
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Mismos parámetros que JSONResponse, para que el JSON no cambie
+_dumps = json.JSONEncoder(
+    ensure_ascii=False,
+    allow_nan=False,
+    indent=None,
+    separators=(",", ":"),
+).encode
+
+
+def dump_json(payload: Any) -> bytes:
+    return _dumps(payload).encode("utf-8")
+
+
+def dump_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def _parse_quality(header: Optional[str]) -> Dict[str, float]:
+    """
+    Valores de una cabecera Accept o Accept-Encoding con su calidad (q)
+    """
+    values: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        value, *params = [part.strip() for part in item.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        values[value.lower()] = quality
+    return values
+
+
+def _available_encodings() -> Dict[str, bool]:
+    # En orden de preferencia del servidor cuando el cliente no distingue
+    return {"zstd": zstandard is not None, "br": brotli is not None, "gzip": True}
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """
+    True si el cliente prefiere MessagePack a JSON
+    """
+    if msgpack is None:
+        return False
+    accepted = _parse_quality(accept)
+    msgpack_quality = max((accepted.get(alias, 0.0) for alias in _MSGPACK_ALIASES), default=0.0)
+    if msgpack_quality <= 0:
+        return False
+    return msgpack_quality >= accepted.get(JSON_MEDIA_TYPE, 0.0)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Codificación de contenido a usar según Accept-Encoding, o None para identity
+    """
+    accepted = _parse_quality(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding, available in _available_encodings().items():
+        quality = accepted.get(encoding, wildcard)
+        if available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def min_compress_size(route: str) -> int:
+    """
+    Tamaño mínimo para comprimir la respuesta de una ruta; negativo desactiva la compresión
+    """
+    if not settings.RESPONSE_COMPRESSION_ENABLED:
+        return -1
+    return settings.RESPONSE_COMPRESSION_MIN_BYTES.get(
+        route, settings.RESPONSE_COMPRESSION_DEFAULT_MIN_BYTES
+    )
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = _gzip_compressor()
+    return compressor.compress(body) + compressor.flush()
+
+
+def _gzip_compressor():
+    # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+    return zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+class StreamCompressor:
+    """
+    Compresión incremental de un cuerpo por bloques; cada bloque se vacía para
+    que el cliente pueda ir procesando la descarga
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = _gzip_compressor()
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "zstd":
+            return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def negotiated_response(
+    headers: Headers,
+    payload: Any,
+    route: str,
+    etag: Optional[str] = None,
+    to_binary: Optional[Callable[[Any], Any]] = None,
+) -> Response:
+    """
+    Respuesta en JSON o MessagePack según Accept, comprimida según Accept-Encoding
+    si supera el umbral de la ruta. payload debe estar ya en forma JSON (fechas como texto);
+    to_binary adapta el payload antes de codificarlo en MessagePack.
+    """
+    if wants_msgpack(headers.get("accept")):
+        if to_binary is not None:
+            payload = to_binary(payload)
+        body, media_type = dump_msgpack(payload), MSGPACK_MEDIA_TYPE
+    else:
+        body, media_type = dump_json(payload), JSON_MEDIA_TYPE
+
+    response_headers = {"Vary": "Accept, Accept-Encoding"}
+    min_size = min_compress_size(route)
+    encoding = None
+    if min_size >= 0 and len(body) >= min_size:
+        encoding = choose_encoding(headers.get("accept-encoding"))
+    if encoding:
+        body = compress(body, encoding)
+        response_headers["Content-Encoding"] = encoding
+    if etag:
+        # Otra representación del mismo recurso: el ETag fuerte es solo para el JSON sin comprimir
+        transformed = encoding is not None or media_type != JSON_MEDIA_TYPE
+        response_headers["ETag"] = f"W/{etag}" if transformed else etag
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+
+async def _compressed(chunks: AsyncIterator[bytes], first: bytes, encoding: Optional[str]) -> AsyncIterator[bytes]:
+    compressor = StreamCompressor(encoding) if encoding else None
+    if first:
+        yield compressor.compress(first) if compressor else first
+    async for chunk in chunks:
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.finish()
+
+
+async def negotiated_stream(
+    headers: Headers,
+    chunks: AsyncIterator[bytes],
+    route: str,
+    media_type: str,
+) -> StreamingResponse:
+    """
+    Respuesta por bloques ya codificados, comprimida de forma incremental.
+    Sin tamaño total conocido, el umbral de la ruta se aplica al primer bloque.
+    """
+    min_size = min_compress_size(route)
+    first = b""
+    encoding = None
+    if min_size > 0:
+        try:
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            pass
+        if len(first) >= min_size:
+            encoding = choose_encoding(headers.get("accept-encoding"))
+    elif min_size == 0:
+        encoding = choose_encoding(headers.get("accept-encoding"))
+
+    response_headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        _compressed(chunks, first, encoding),
+        media_type=media_type,
+        headers=response_headers,
+    )
@@ -0,0 +1,130 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+PROFILE_SUFFIX = ".prof"
+
+
+class ProfileStore:
+    """
+    Búfer circular de perfiles en disco: conserva solo los últimos max_files
+    """
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def new_name(self, method: str, path: str) -> str:
+        slug = _UNSAFE_CHARS_RE.sub("_", path.strip("/")) or "root"
+        return f"{time.time_ns()}-{method.upper()}-{slug[:80]}{PROFILE_SUFFIX}"
+
+    def save(self, name: str, profiler: cProfile.Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(self.directory / name))
+        self._trim()
+
+    def _trim(self) -> None:
+        files = sorted(self.directory.glob(f"*{PROFILE_SUFFIX}"))
+        for old in files[: max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True):
+            stat = path.stat()
+            profiles.append({"name": path.name, "size": stat.st_size, "created_at": stat.st_mtime})
+        return profiles
+
+    def path(self, name: str) -> Optional[Path]:
+        # Solo nombres generados por el propio almacén, sin rutas
+        if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def as_text(self, name: str, limit: int = 50) -> Optional[str]:
+        path = self.path(name)
+        if path is None:
+            return None
+        buffer = io.StringIO()
+        pstats.Stats(str(path), stream=buffer).sort_stats("cumulative").print_stats(limit)
+        return buffer.getvalue()
+
+
+class ProfilerMiddleware:
+    """
+    Ejecuta bajo cProfile las peticiones que traen la cabecera indicada, solo para
+    superusuarios. Sin la cabecera, o sin permiso, la petición pasa directamente.
+    Solo puede haber un perfil activo en el hilo del bucle de eventos: una segunda
+    petición perfilada mientras tanto recibe 409.
+    """
+
+    def __init__(self, app, store: ProfileStore, header: str):
+        self.app = app
+        self.store = store
+        self.header = header.lower().encode()
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(k == self.header for k, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self._authorized(scope):
+            # La cabecera es opcional: sin permiso se ignora y la petición sigue su curso
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock.locked():
+            response = JSONResponse({"detail": "Ya hay otra petición en perfilado"}, status_code=409)
+            await response(scope, receive, send)
+            return
+
+        name = self.store.new_name(scope.get("method", ""), scope.get("path", ""))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        async with self._lock:
+            # El perfil es del hilo: incluye también otras corrutinas que se ejecuten a la vez
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+                # Escritura en disco fuera del bucle de eventos
+                await asyncio.get_running_loop().run_in_executor(None, self.store.save, name, profiler)
+
+    async def _authorized(self, scope) -> bool:
+        # Importación diferida: deps depende de la configuración y de la base de datos
+        from app.api import deps
+        from app.db.session import async_session
+
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode()
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            async with async_session() as db:
+                user = await deps.authenticate_token(db, token)
+            await deps.get_current_active_superuser(current_user=user)
+        except HTTPException:
+            return False
+        return True
\ No newline at end of file
@@ -1,5 +1,8 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Dict, Union
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -8,6 +11,72 @@ from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Pool dedicado para que bcrypt no bloquee el bucle de eventos
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+
+class PasswordHasherBusy(Exception):
+    """
+    El pool de hashing tiene la cola llena
+    """
+
+
+class HashMetrics:
+    """
+    Métricas de las operaciones de hashing de contraseñas
+    """
+
+    def __init__(self) -> None:
+        self.pending = 0
+        self.count = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "count": self.count,
+            "rejected": self.rejected,
+            "hash_seconds_total": self.hash_seconds_total,
+            "hash_seconds_max": self.hash_seconds_max,
+            "hash_seconds_avg": self.hash_seconds_total / self.count if self.count else 0.0,
+            "wait_seconds_total": self.wait_seconds_total,
+        }
+
+
+hash_metrics = HashMetrics()
+
+
+async def _run_in_hash_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Ejecuta una operación de hashing en el pool dedicado, rechazando si la cola está llena
+    """
+    if hash_metrics.pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        hash_metrics.rejected += 1
+        raise PasswordHasherBusy()
+    
+    def timed() -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            hash_metrics.hash_seconds_total += elapsed
+            hash_metrics.hash_seconds_max = max(hash_metrics.hash_seconds_max, elapsed)
+    
+    hash_metrics.pending += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, timed)
+    finally:
+        hash_metrics.pending -= 1
+        hash_metrics.count += 1
+        hash_metrics.wait_seconds_total += time.perf_counter() - start
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -37,4 +106,18 @@ def get_password_hash(password: str) -> str:
     """
     Generar hash para una contraseña
     """
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Versión asíncrona de verify_password ejecutada en el pool de hashing
+    """
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Versión asíncrona de get_password_hash ejecutada en el pool de hashing
+    """
+    return await _run_in_hash_pool(get_password_hash, password)
\ No newline at end of file
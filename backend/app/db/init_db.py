@@ -8,6 +8,7 @@ from app.models.project import Project
 from app.models.project_settings import ProjectSettings
 from app.models.element import Element
 from app.models.layer import Layer
+from app.models.tombstone import Tombstone
 from app.core.security import get_password_hash
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,36 @@
+import json
+
+from sqlalchemy import Select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def exact_count(db: AsyncSession, query: Select) -> int:
+    """
+    Cuenta las filas de una consulta con SELECT count(*) sin cargar objetos
+    """
+    count_query = (
+        query.with_only_columns(func.count(), maintain_column_froms=True)
+        .order_by(None)
+        .limit(None)
+        .offset(None)
+    )
+    return (await db.execute(count_query)).scalar_one()
+
+
+async def estimated_count(db: AsyncSession, query: Select) -> int:
+    """
+    Estimación barata del número de filas a partir del plan de PostgreSQL.
+    En otros motores se recurre al conteo exacto.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return await exact_count(db, query)
+
+    compiled = query.order_by(None).limit(None).offset(None).compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
\ No newline at end of file
@@ -0,0 +1,32 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.project import Project
+
+
+async def bump_project_revision(db: AsyncSession, project_id: int) -> int:
+    """
+    Incrementa la revisión del proyecto dentro de la transacción actual y la devuelve
+    """
+    query = (
+        update(Project)
+        .where(Project.id == project_id)
+        .values(revision=Project.revision + 1)
+        .returning(Project.revision)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(query)
+    return result.scalar_one()
+
+
+async def bump_project_revisions(db: AsyncSession, project_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Incrementa la revisión de varios proyectos y devuelve {project_id: revisión}
+    """
+    # Orden fijo para evitar interbloqueos entre transacciones concurrentes
+    return {
+        project_id: await bump_project_revision(db, project_id)
+        for project_id in sorted(set(project_ids))
+    }
\ No newline at end of file
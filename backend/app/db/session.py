@@ -1,15 +1,63 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Any, Dict
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 
-engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), echo=True)
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """
+    Opciones del motor según la configuración y el driver de la URL
+    """
+    parsed = make_url(url)
+    options: Dict[str, Any] = {"echo": settings.SQLALCHEMY_ECHO}
+    
+    # SQLite usa sus propios pools y no admite estos parámetros
+    if parsed.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    
+    return options
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url, **_engine_options(url))
+
+
+engine = _create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Réplica de solo lectura; sin configurar, las lecturas van al primario
+if settings.SQLALCHEMY_REPLICA_URI:
+    read_engine = _create_engine(settings.SQLALCHEMY_REPLICA_URI)
+    read_session = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+else:
+    read_engine = engine
+    read_session = async_session
+
 
 async def get_db() -> AsyncSession:
     """
     Dependencia para obtener una sesión de base de datos
     """
     async with async_session() as session:
+        yield session
+
+
+async def get_read_db() -> AsyncSession:
+    """
+    Dependencia para obtener una sesión de solo lectura (réplica si está configurada)
+    """
+    async with read_session() as session:
         yield session
\ No newline at end of file
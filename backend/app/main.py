@@ -1,8 +1,16 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.api import deps
 from app.api.api_v1.api import api_router
+from app.api.api_v1.endpoints.admin import profile_store
 from app.core.config import settings
+from app.core.instrumentation import QueryMetricsMiddleware, instrument_engine, render_prometheus
+from app.core.profiling import ProfilerMiddleware
 from app.db.init_db import init_db
+from app.db.session import engine, read_engine
+from app.services.element_writer import element_writer
+from app.services.intent_model import intent_model
 
 app = FastAPI(
     title="CAD-NLP API",
@@ -20,6 +28,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas de consultas SQL por petición (Server-Timing y /metrics)
+if settings.SQL_METRICS_ENABLED:
+    instrument_engine(engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine)
+    app.add_middleware(
+        QueryMetricsMiddleware,
+        query_budget=settings.SQL_QUERY_BUDGET,
+        repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
+    )
+
+# Perfilado bajo demanda; desactivado no añade ningún middleware
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware, store=profile_store, header=settings.PROFILING_HEADER)
+
 # Incluir routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -27,6 +50,29 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def startup_db_client():
     await init_db()
 
+@app.on_event("startup")
+async def startup_intent_model():
+    # La carga se hace en segundo plano: la API responde con las reglas mientras tanto
+    if settings.NLP_MODEL_ENABLED:
+        intent_model.start()
+
+@app.on_event("shutdown")
+async def shutdown_intent_model():
+    await intent_model.stop()
+
+@app.on_event("shutdown")
+async def shutdown_element_writer():
+    await element_writer.stop()
+
 @app.get("/")
 async def root():
-    return {"message": "Bienvenido a CAD-NLP API"}
\ No newline at end of file
+    return {"message": "Bienvenido a CAD-NLP API"}
+
+@app.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(deps.get_metrics_access)],
+)
+async def metrics():
+    return render_prometheus()
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, DateTime, Float, Index
 from sqlalchemy.orm import relationship, Mapped
 from sqlalchemy.sql import func
 
@@ -11,6 +11,15 @@ class Element(Base):
     """
     Modelo para elementos de dibujo
     """
+    __table_args__ = (
+        # Índice para consultas por ventana visible (bbox) dentro de un proyecto
+        Index("ix_element_project_bbox", "project_id", "min_x", "max_x", "min_y", "max_y"),
+        # Índice para paginación keyset por id dentro de un proyecto
+        Index("ix_element_project_id_id", "project_id", "id"),
+        # Índice para sincronización incremental por revisión
+        Index("ix_element_project_revision", "project_id", "revision"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("project.id"), nullable=False)
     layer_id = Column(Integer, ForeignKey("layer.id"), nullable=False)
@@ -22,6 +31,12 @@ class Element(Base):
     # Almacenado como JSON para flexibilidad
     geometry = Column(JSON, nullable=False)
     
+    # Caja envolvente derivada de la geometría (ver app.utils.geometry)
+    min_x = Column(Float, nullable=True)
+    min_y = Column(Float, nullable=True)
+    max_x = Column(Float, nullable=True)
+    max_y = Column(Float, nullable=True)
+    
     # Propiedades de estilo
     style = Column(JSON, nullable=False)
     
@@ -32,6 +47,9 @@ class Element(Base):
     # Metadatos adicionales
     metadata = Column(JSON, default={})
     
+    # Revisión del proyecto en la que se creó o modificó por última vez
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
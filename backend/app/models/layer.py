@@ -1,6 +1,6 @@
 from typing import List
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship, Mapped
 
 from app.db.base_class import Base
@@ -10,6 +10,11 @@ class Layer(Base):
     """
     Modelo para capas en un proyecto
     """
+    __table_args__ = (
+        # Índice para sincronización incremental por revisión
+        Index("ix_layer_project_revision", "project_id", "revision"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("project.id"), nullable=False)
     name = Column(String, nullable=False)
@@ -17,6 +22,7 @@ class Layer(Base):
     locked = Column(Boolean, default=False)
     color = Column(String, default="#000000")  # Color por defecto para elementos en esta capa
     order = Column(Integer, default=0)  # Orden de renderizado (mayor = encima)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # Revisión del proyecto en la última escritura
     
     # Relaciones
     project: Mapped["Project"] = relationship("Project", back_populates="layers")
@@ -16,6 +16,8 @@ class Project(Base):
     name = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    # Revisión incrementada en cada cambio de capas o elementos (ETag, sincronización)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+class Tombstone(Base):
+    """
+    Registro de entidades eliminadas para la sincronización incremental
+    """
+    __table_args__ = (
+        Index("ix_tombstone_project_revision", "project_id", "revision"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("project.id", ondelete="CASCADE"), nullable=False)
+    
+    # Tipo de entidad eliminada (element, layer) y su id original
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    
+    # Revisión del proyecto en la que se eliminó
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
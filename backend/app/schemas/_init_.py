@@ -7,7 +7,9 @@ from .project import (
     ProjectSettings, 
     ProjectSettingsCreate, 
     ProjectSettingsUpdate,
-    ProjectWithSettings
+    ProjectWithSettings,
+    ProjectSnapshot,
+    ProjectChanges
 )
 from .layer import Layer, LayerCreate, LayerUpdate, LayerList
 from .element import (
@@ -18,5 +20,8 @@ from .element import (
     ElementBulkCreate, 
     ElementBulkUpdate, 
     ElementBulkDelete,
+    ElementBulkResult,
+    ElementTransform,
+    PackedPoints,
     Point
 )
\ No newline at end of file
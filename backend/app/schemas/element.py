@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Literal, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.utils.packing import is_packed, validate_packed
 
 
 # Geometría y coordenadas
@@ -16,8 +18,20 @@ class LineGeometry(BaseModel):
     end: Point
 
 
+# Puntos empaquetados: x0, y0, x1, y1... little-endian en base64
+class PackedPoints(BaseModel):
+    encoding: Literal["f64le", "f32le"] = "f64le"
+    data: str
+
+    @field_validator("data")
+    @classmethod
+    def check_data(cls, v: str, info) -> str:
+        validate_packed({"encoding": info.data.get("encoding", "f64le"), "data": v})
+        return v
+
+
 class PolylineGeometry(BaseModel):
-    points: List[Point]
+    points: Union[PackedPoints, List[Point]]
     closed: bool = False
 
 
@@ -70,6 +84,12 @@ class ElementStyle(BaseModel):
     fillOpacity: float
 
 
+def _check_packed_points(geometry: Optional[Dict[str, Any]]) -> None:
+    # Los puntos empaquetados se validan como array, sin un modelo por punto
+    if geometry is not None and is_packed(geometry.get("points")):
+        validate_packed(geometry["points"])
+
+
 # Propiedades base para elementos
 class ElementBase(BaseModel):
     type: str  # line, polyline, rectangle, circle, arc, text
@@ -80,6 +100,12 @@ class ElementBase(BaseModel):
     locked: Optional[bool] = False
     metadata: Optional[Dict[str, Any]] = {}
 
+    @model_validator(mode="after")
+    def check_packed_points(self):
+        if self.type == "polyline":
+            _check_packed_points(self.geometry)
+        return self
+
 
 # Propiedades para crear un elemento
 class ElementCreate(ElementBase):
@@ -96,11 +122,19 @@ class ElementUpdate(BaseModel):
     locked: Optional[bool] = None
     metadata: Optional[Dict[str, Any]] = None
 
+    @model_validator(mode="after")
+    def check_packed_points(self):
+        # Sin type en la actualización el tipo es el guardado: se valida igualmente
+        if self.type in (None, "polyline"):
+            _check_packed_points(self.geometry)
+        return self
+
 
 # Propiedades comunes para la respuesta de elementos
 class ElementInDBBase(ElementBase):
     id: int
     project_id: int
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -116,7 +150,8 @@ class Element(ElementInDBBase):
 # Respuesta con lista de elementos
 class ElementList(BaseModel):
     elements: List[Element]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[int] = None
 
 
 # Bulk operations
@@ -129,4 +164,46 @@ class ElementBulkUpdate(BaseModel):
 
 
 class ElementBulkDelete(BaseModel):
-    ids: List[int]
\ No newline at end of file
+    ids: List[int]
+
+
+# Respuesta de operaciones masivas
+class ElementBulkResult(BaseModel):
+    ids: List[int]
+
+# Transformaciones afines y matrices de copias
+class RectangularArray(BaseModel):
+    kind: Literal["rectangular"] = "rectangular"
+    rows: int = Field(1, ge=1)
+    columns: int = Field(1, ge=1)
+    row_spacing: float = 0
+    column_spacing: float = 0
+
+
+class PolarArray(BaseModel):
+    kind: Literal["polar"] = "polar"
+    count: int = Field(..., ge=2)
+    center: Point
+    angle: float = 360  # ángulo total en grados, positivo antihorario
+    rotate_items: bool = True  # si es False las copias se trasladan sin girar
+
+
+class ElementTransform(BaseModel):
+    project_id: int
+    # Selección: ids explícitos y/o filtros; bbox selecciona los elementos contenidos en la ventana
+    ids: Optional[List[int]] = None
+    layer_id: Optional[int] = None
+    element_type: Optional[str] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    # Matriz afín con los coeficientes de canvas (a, b, c, d, e, f)
+    matrix: Optional[Tuple[float, float, float, float, float, float]] = None
+    duplicate: bool = False  # aplicar matrix a una copia en lugar de mover los elementos
+    array: Optional[Union[RectangularArray, PolarArray]] = Field(None, discriminator="kind")
+
+    @model_validator(mode="after")
+    def check_operation(self):
+        if (self.matrix is None) == (self.array is None):
+            raise ValueError("Indique matrix o array, pero no ambos")
+        if self.ids is None and self.layer_id is None and self.element_type is None and self.bbox is None:
+            raise ValueError("Indique ids o algún filtro (layer_id, element_type, bbox)")
+        return self
@@ -27,6 +27,7 @@ class LayerUpdate(LayerBase):
 class LayerInDBBase(LayerBase):
     id: int
     project_id: int
+    revision: int = 0
     
     class Config:
         from_attributes = True
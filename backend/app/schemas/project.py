@@ -3,6 +3,9 @@ from typing import Optional, List, Dict, Any
 
 from pydantic import BaseModel, Field
 
+from .element import Element
+from .layer import Layer
+
 
 # Propiedades compartidas para proyectos
 class ProjectBase(BaseModel):
@@ -62,6 +65,7 @@ class ProjectSettings(ProjectSettingsInDBBase):
 class ProjectInDBBase(ProjectBase):
     id: int
     user_id: int
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -76,4 +80,22 @@ class Project(ProjectInDBBase):
 
 # Respuesta detallada del proyecto que incluye configuración
 class ProjectWithSettings(Project):
-    settings: Optional[ProjectSettings] = None
\ No newline at end of file
+    settings: Optional[ProjectSettings] = None
+
+
+# Estado completo del proyecto en una sola respuesta
+class ProjectSnapshot(BaseModel):
+    project: ProjectWithSettings
+    layers: List[Layer]
+    elements: List[Element]
+    revision: int
+
+
+# Cambios de un proyecto desde una revisión dada
+class ProjectChanges(BaseModel):
+    since: int
+    revision: int
+    layers: List[Layer]
+    elements: List[Element]
+    deleted_layers: List[int]
+    deleted_elements: List[int]
\ No newline at end of file
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.element import Element
+from app.utils.measure import METRICS, GeometryBatch, measure
+
+STATS_COLUMNS = (
+    Element.layer_id, Element.type, Element.geometry,
+    Element.min_x, Element.min_y, Element.max_x, Element.max_y,
+)
+
+
+def _empty_totals() -> Dict[str, float]:
+    return {"count": 0, "length": 0.0, "perimeter": 0.0, "area": 0.0}
+
+
+def _add(target: Dict[str, float], values: Dict[str, float]) -> None:
+    for name in METRICS:
+        target[name] += values[name]
+
+
+def compute_project_stats(rows: List[Any]) -> Dict[str, Any]:
+    """
+    Mediciones de un proyecto a partir de sus filas de elementos (trabajo de CPU,
+    pensado para ejecutarse fuera del bucle de eventos)
+    """
+    layer_ids = sorted({row.layer_id for row in rows})
+    group_of = {layer_id: i for i, layer_id in enumerate(layer_ids)}
+
+    batch = GeometryBatch()
+    for row in rows:
+        batch.add(group_of[row.layer_id], row.type, row.geometry, (row.min_x, row.min_y, row.max_x, row.max_y))
+    measured = measure(batch, len(layer_ids))
+
+    totals = _empty_totals()
+    by_type: Dict[str, Dict[str, float]] = {}
+    by_layer: Dict[int, Dict[str, Any]] = {}
+    for (group, element_type), values in sorted(measured["by_group_type"].items()):
+        layer_id = layer_ids[group]
+        layer = by_layer.setdefault(layer_id, {"layer_id": layer_id, "totals": _empty_totals(), "by_type": {}})
+        layer["by_type"][element_type] = values
+        _add(layer["totals"], values)
+        _add(by_type.setdefault(element_type, _empty_totals()), values)
+        _add(totals, values)
+
+    extents = measured["extents"]
+    return {
+        "totals": totals,
+        "by_type": by_type,
+        "by_layer": list(by_layer.values()),
+        "extents": None if extents is None else dict(zip(("min_x", "min_y", "max_x", "max_y"), extents)),
+        "invalid": batch.invalid,
+    }
+
+
+class ProjectStatsService:
+    """
+    Mediciones por proyecto en caché hasta que cambia su revisión
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    async def get(self, db: AsyncSession, project_id: int, revision: int) -> Dict[str, Any]:
+        cached: Optional[Dict[str, Any]] = self.cache.get(project_id)
+        if cached is not None and cached["revision"] == revision:
+            return cached
+
+        result = await db.execute(select(*STATS_COLUMNS).where(Element.project_id == project_id))
+        rows = result.all()
+        # El cálculo vectorizado no bloquea el bucle de eventos
+        stats = await asyncio.get_running_loop().run_in_executor(None, compute_project_stats, rows)
+        stats = {"project_id": project_id, "revision": revision, **stats}
+        self.cache.set(project_id, stats)
+        return stats
+
+
+project_stats = ProjectStatsService(
+    TTLCache(settings.PROJECT_STATS_CACHE_SIZE, settings.PROJECT_STATS_CACHE_TTL_SECONDS)
+)
@@ -0,0 +1,110 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+
+def make_change(
+    entity: str, op: str, entity_id: int, revision: int, data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Construye un evento de cambio para publicar en el hub
+    """
+    return {"entity": entity, "op": op, "id": entity_id, "revision": revision, "data": data}
+
+
+class Subscription:
+    """
+    Cola de cambios pendientes de un cliente.
+    Los cambios sobre la misma entidad se agrupan y solo se conserva el último.
+    """
+
+    def __init__(self, project_id: int, max_pending: int):
+        self.project_id = project_id
+        self.max_pending = max_pending
+        self.overflowed = False
+        self._pending: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._event = asyncio.Event()
+
+    def push(self, change: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        key = (change["entity"], change["id"])
+        previous = self._pending.pop(key, None)
+        # Dos actualizaciones seguidas se fusionan (pueden ser parciales)
+        if (
+            previous is not None
+            and previous["op"] == change["op"] == "upsert"
+            and previous["data"] and change["data"]
+        ):
+            change = {**change, "data": {**previous["data"], **change["data"]}}
+        self._pending[key] = change
+        # Cliente lento: se descarta lo pendiente y se le pide resincronizar
+        if len(self._pending) > self.max_pending:
+            self._pending.clear()
+            self.overflowed = True
+        self._event.set()
+
+    async def next_batch(self, window: float) -> Optional[List[Dict[str, Any]]]:
+        """
+        Espera cambios, deja pasar la ventana de agrupación y devuelve el lote.
+        Devuelve None si el cliente debe resincronizar.
+        """
+        await self._event.wait()
+        if window > 0:
+            await asyncio.sleep(window)
+        self._event.clear()
+        if self.overflowed:
+            self.overflowed = False
+            self._pending.clear()
+            return None
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class ChangeHub:
+    """
+    Pub/sub en proceso que reparte los cambios de cada proyecto a sus suscriptores
+    """
+
+    def __init__(self, coalesce_window: float, max_pending: int):
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, project_id: int) -> Subscription:
+        subscription = Subscription(project_id, self.max_pending)
+        self._subscriptions.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscriptions.get(subscription.project_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscriptions[subscription.project_id]
+
+    def subscriber_count(self, project_id: int) -> int:
+        return len(self._subscriptions.get(project_id, ()))
+
+    def publish(self, project_id: int, changes: Iterable[Dict[str, Any]]) -> None:
+        """
+        Encola cambios para todos los suscriptores del proyecto sin bloquear al emisor.
+        Cada cambio: {"entity": "element"|"layer", "op": "upsert"|"delete", "id", "revision", "data"}
+        """
+        subscribers = self._subscriptions.get(project_id)
+        if not subscribers:
+            return
+        changes = list(changes)
+        for subscription in subscribers:
+            for change in changes:
+                subscription.push(change)
+
+
+change_hub = ChangeHub(
+    coalesce_window=settings.REALTIME_COALESCE_MS / 1000,
+    max_pending=settings.REALTIME_MAX_PENDING,
+)
\ No newline at end of file
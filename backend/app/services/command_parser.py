@@ -0,0 +1,424 @@
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+# Analizador de comandos en lenguaje natural (español) para crear geometrías.
+# El texto se recorre una sola vez con una expresión regular precompilada: cada
+# palabra clave abre un "hueco" (desde, hasta, radio...) y los números y puntos
+# que siguen se asignan a él. Cada tipo de elemento se registra con su manejador.
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<STRING>"[^"]*"|'[^']*'|“[^”]*”)
+    |(?P<NUMBER>[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<WORD>[^\W\d_]+|°)
+    |(?P<COMMA>,)
+    |(?P<SKIP>[\s;:()\[\]]+)
+    |(?P<OTHER>.)
+    """,
+    re.VERBOSE,
+)
+
+VERBS = {"crear", "crea", "dibujar", "dibuja", "trazar", "traza", "anadir", "anade", "agregar", "agrega", "insertar", "inserta"}
+
+# Palabra clave (sin tildes) -> hueco al que se asignan los valores siguientes
+KEYWORDS = {
+    "de": "from", "desde": "from",
+    "a": "to", "hasta": "to",
+    "en": "at", "centro": "at", "posicion": "at", "origen": "at", "esquina": "at",
+    "ancho": "width", "anchura": "width",
+    "alto": "height", "altura": "height",
+    "por": "by", "x": "by",
+    "radio": "radius",
+    "diametro": "diameter",
+    "rotacion": "rotation", "rotado": "rotation", "girado": "rotation", "angulo": "rotation",
+    "inicio": "start_angle", "fin": "end_angle",
+    "tamano": "size", "fuente": "size",
+    "puntos": "points", "vertices": "points",
+}
+
+FLAGS = {"cerrada": ("closed", True), "cerrado": ("closed", True), "abierta": ("closed", False), "abierto": ("closed", False)}
+
+FILLERS = {"un", "una", "el", "la", "los", "las", "con", "y", "e", "nuevo", "nueva", "que", "sea", "punto", "texto"}
+
+# Factores de conversión a metros
+LENGTH_UNITS = {
+    "m": 1.0, "metro": 1.0, "metros": 1.0,
+    "cm": 0.01, "centimetro": 0.01, "centimetros": 0.01,
+    "mm": 0.001, "milimetro": 0.001, "milimetros": 0.001,
+    "km": 1000.0, "kilometro": 1000.0, "kilometros": 1000.0,
+    "ft": 0.3048, "pie": 0.3048, "pies": 0.3048,
+    "in": 0.0254, "pulgada": 0.0254, "pulgadas": 0.0254,
+}
+
+# Unidad de dibujo de cada sistema del proyecto, en metros: los valores sin unidad
+# se toman en esta unidad y los que la indican se convierten a ella
+DRAWING_UNITS = {"metric": 1.0, "imperial": 0.3048}
+
+ANGLE_UNITS = {
+    "°": "deg", "grado": "deg", "grados": "deg", "deg": "deg",
+    "rad": "rad", "radian": "rad", "radianes": "rad",
+}
+
+
+class CommandError(ValueError):
+    """
+    El comando se reconoció pero sus parámetros no son válidos
+    """
+
+
+@dataclass
+class Number:
+    value: float
+    unit: Optional[str] = None
+
+    def length(self, drawing_unit: float = 1.0) -> float:
+        if self.unit not in LENGTH_UNITS:
+            return self.value
+        # Redondeo para no arrastrar el error de la conversión (12 in -> 0.9999999999999998 ft)
+        return round(self.value * LENGTH_UNITS[self.unit] / drawing_unit, 12)
+
+    def degrees(self) -> float:
+        return math.degrees(self.value) if ANGLE_UNITS.get(self.unit) == "rad" else self.value
+
+    def radians(self) -> float:
+        return self.value if ANGLE_UNITS.get(self.unit) == "rad" else math.radians(self.value)
+
+
+@dataclass
+class Point:
+    x: Number
+    y: Number
+
+    def as_dict(self, drawing_unit: float = 1.0) -> Dict[str, float]:
+        return {"x": self.x.length(drawing_unit), "y": self.y.length(drawing_unit)}
+
+
+Value = Union[Number, Point]
+
+
+@dataclass
+class ParsedCommand:
+    """
+    Resultado del recorrido léxico: verbo, sustantivo y valores por hueco
+    """
+    verb: Optional[str] = None
+    noun: Optional[str] = None
+    slots: Dict[str, List[Value]] = field(default_factory=dict)
+    points: List[Point] = field(default_factory=list)
+    flags: Dict[str, Any] = field(default_factory=dict)
+    strings: List[str] = field(default_factory=list)
+    words: List[str] = field(default_factory=list)
+    # Metros por unidad de dibujo del proyecto (ver DRAWING_UNITS)
+    drawing_unit: float = 1.0
+
+    def values(self, slot: str) -> List[Value]:
+        return self.slots.get(slot, [])
+
+    def point(self, *slots: str) -> Optional[Point]:
+        for slot in slots:
+            for value in self.values(slot):
+                if isinstance(value, Point):
+                    return value
+        return None
+
+    def number(self, *slots: str) -> Optional[Number]:
+        for slot in slots:
+            for value in self.values(slot):
+                if isinstance(value, Number):
+                    return value
+        return None
+
+    def require_point(self, *slots: str) -> Point:
+        point = self.point(*slots)
+        if point is None:
+            raise CommandError(f"falta un punto ({' / '.join(slots)})")
+        return point
+
+    def require_number(self, *slots: str) -> Number:
+        number = self.number(*slots)
+        if number is None:
+            raise CommandError(f"falta un valor ({' / '.join(slots)})")
+        return number
+
+
+@dataclass
+class CommandResult:
+    recognized: bool
+    action: Optional[str] = None
+    params: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+CommandHandler = Callable[[ParsedCommand], Dict[str, Any]]
+
+
+def _normalize(word: str) -> str:
+    """
+    Minúsculas y sin tildes (la ñ se convierte en n)
+    """
+    decomposed = unicodedata.normalize("NFD", word.lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+
+
+def tokenize_command(command: str, nouns: Iterable[str] = ()) -> ParsedCommand:
+    """
+    Recorre el comando una sola vez y agrupa números, puntos y palabras clave
+    """
+    nouns = set(nouns)
+    parsed = ParsedCommand()
+    slot = "_positional"
+    pending: Optional[Number] = None
+    pending_slot = slot
+    comma = False
+    # Números sin unidad del hueco actual: una unidad al final ("en 1,1 cm") se aplica
+    # a todo el hueco, pero no a los anteriores ("en 10,10 radio 50 cm"). "por" no abre
+    # un grupo nuevo: "2 por 3 cm" son dos medidas con la misma unidad
+    unitless: List[Number] = []
+
+    def emit(value: Value, target: str) -> None:
+        parsed.slots.setdefault(target, []).append(value)
+        if isinstance(value, Point):
+            parsed.points.append(value)
+
+    def flush() -> None:
+        nonlocal pending, comma
+        if pending is not None:
+            emit(pending, pending_slot)
+        pending = None
+        comma = False
+
+    for match in _TOKEN_RE.finditer(command):
+        kind = match.lastgroup
+        text = match.group()
+
+        if kind == "NUMBER":
+            number = Number(float(text))
+            unitless.append(number)
+            if pending is not None and comma:
+                emit(Point(pending, number), pending_slot)
+                pending = None
+                comma = False
+            else:
+                flush()
+                pending, pending_slot = number, slot
+        elif kind == "COMMA":
+            if pending is not None:
+                comma = True
+        elif kind == "WORD":
+            word = _normalize(text)
+            if word in LENGTH_UNITS and unitless:
+                for number in unitless:
+                    if number.unit is None:
+                        number.unit = word
+                unitless.clear()
+                continue
+            # Unidad angular pegada al último número o punto
+            if word in ANGLE_UNITS:
+                if pending is not None and not comma:
+                    pending.unit = word
+                    continue
+                last = parsed.slots.get(pending_slot, [])[-1:] if pending is None else []
+                if last and isinstance(last[0], Point) and last[0].y.unit is None:
+                    last[0].x.unit = last[0].x.unit or word
+                    last[0].y.unit = word
+                    continue
+                if last and isinstance(last[0], Number) and last[0].unit is None:
+                    last[0].unit = word
+                    continue
+            flush()
+            if parsed.verb is None and word in VERBS:
+                parsed.verb = word
+            elif parsed.noun is None and word in nouns:
+                parsed.noun = word
+            elif word in KEYWORDS:
+                slot = KEYWORDS[word]
+                if slot != "by":
+                    unitless.clear()
+            elif word in FLAGS:
+                name, value = FLAGS[word]
+                parsed.flags[name] = value
+            elif word not in FILLERS:
+                parsed.words.append(text)
+        elif kind == "STRING":
+            flush()
+            parsed.strings.append(text[1:-1])
+        elif kind == "OTHER":
+            flush()
+
+    flush()
+    return parsed
+
+
+def split_script(script: str) -> List[str]:
+    """
+    Divide un guion en comandos: uno por línea, o separados por ';' cuando
+    lo que sigue empieza por un verbo (el ';' también separa puntos de polilíneas)
+    """
+    commands: List[str] = []
+    for line in script.splitlines():
+        line_start = len(commands)
+        for fragment in line.split(";"):
+            stripped = fragment.strip()
+            if not stripped:
+                continue
+            first_word = _normalize(stripped.split(None, 1)[0])
+            if len(commands) > line_start and first_word not in VERBS:
+                commands[-1] = f"{commands[-1]}; {stripped}"
+            else:
+                commands.append(stripped)
+    return commands
+
+
+class CommandParser:
+    """
+    Registro de comandos: cada sustantivo (línea, círculo...) apunta a una acción y su manejador
+    """
+
+    def __init__(self) -> None:
+        self._nouns: Dict[str, str] = {}
+        self._handlers: Dict[str, CommandHandler] = {}
+
+    def register(self, action: str, nouns: Iterable[str]) -> Callable[[CommandHandler], CommandHandler]:
+        """
+        Decorador para registrar un nuevo tipo de comando sin tocar el analizador
+        """
+        def decorator(handler: CommandHandler) -> CommandHandler:
+            self._handlers[action] = handler
+            for noun in nouns:
+                self._nouns[_normalize(noun)] = action
+            return handler
+        return decorator
+
+    @property
+    def actions(self) -> List[str]:
+        return list(self._handlers)
+
+    def parse(self, command: str, action: Optional[str] = None, unit_system: Optional[str] = None) -> CommandResult:
+        """
+        Analiza un comando. Con action (p.ej. la intención predicha por el modelo)
+        se aplica ese manejador aunque el texto no nombre el tipo de elemento.
+        Las longitudes se devuelven en la unidad de dibujo de unit_system (metros por defecto).
+        """
+        parsed = tokenize_command(command, self._nouns)
+        parsed.drawing_unit = DRAWING_UNITS.get(unit_system, 1.0)
+        if action is None:
+            if parsed.noun is None:
+                return CommandResult(recognized=False, error="Comando no reconocido")
+            action = self._nouns[parsed.noun]
+        elif action not in self._handlers:
+            return CommandResult(recognized=False, error="Comando no reconocido")
+
+        try:
+            params = self._handlers[action](parsed)
+        except CommandError as e:
+            return CommandResult(
+                recognized=False,
+                action=action,
+                error=f"No se pudo interpretar el comando: {str(e)}",
+            )
+        return CommandResult(recognized=True, action=action, params=params)
+
+
+command_parser = CommandParser()
+
+
+@command_parser.register("create_line", ["línea", "linea", "recta", "segmento"])
+def _parse_line(cmd: ParsedCommand) -> Dict[str, Any]:
+    # "crear línea de 1,1 a 3,3" o "línea 1,1 3,3"
+    start = cmd.point("from", "at")
+    end = cmd.point("to")
+    if start is None or end is None:
+        if len(cmd.points) < 2:
+            raise CommandError("se necesitan un punto inicial y uno final")
+        start, end = start or cmd.points[0], end or cmd.points[1]
+    return {"start": start.as_dict(cmd.drawing_unit), "end": end.as_dict(cmd.drawing_unit)}
+
+
+@command_parser.register("create_rectangle", ["rectángulo", "rectangulo", "cuadrado", "recuadro"])
+def _parse_rectangle(cmd: ParsedCommand) -> Dict[str, Any]:
+    # "crear rectángulo en 1,1 con ancho 2 y alto 3" o "rectángulo de 2 por 3 en 1,1"
+    top_left = cmd.point("at", "from", "_positional")
+    width = cmd.number("width", "from", "_positional")
+    height = cmd.number("height", "by")
+    if top_left is None:
+        raise CommandError("falta la posición")
+    if width is None:
+        raise CommandError("falta el ancho")
+    if height is None:
+        if cmd.noun != "cuadrado":
+            raise CommandError("falta el alto")
+        height = width
+    rotation = cmd.number("rotation")
+    return {
+        "topLeft": top_left.as_dict(cmd.drawing_unit),
+        "width": width.length(cmd.drawing_unit),
+        "height": height.length(cmd.drawing_unit),
+        "rotation": rotation.degrees() if rotation else 0,
+    }
+
+
+@command_parser.register("create_circle", ["círculo", "circulo", "circunferencia"])
+def _parse_circle(cmd: ParsedCommand) -> Dict[str, Any]:
+    # "crear círculo en 0,0 con radio 5" o "círculo centro 0,0 diámetro 10"
+    center = cmd.point("at", "from", "_positional")
+    if center is None:
+        raise CommandError("falta el centro")
+    radius = cmd.number("radius")
+    if radius is not None:
+        value = radius.length(cmd.drawing_unit)
+    else:
+        value = cmd.require_number("diameter", "_positional").length(cmd.drawing_unit) / 2
+    if value <= 0:
+        raise CommandError("el radio debe ser positivo")
+    return {"center": center.as_dict(cmd.drawing_unit), "radius": value}
+
+
+@command_parser.register("create_arc", ["arco"])
+def _parse_arc(cmd: ParsedCommand) -> Dict[str, Any]:
+    # "crear arco en 0,0 con radio 5 de 0 a 90 grados" (ángulos en radianes en la salida)
+    center = cmd.require_point("at", "_positional")
+    radius = cmd.require_number("radius").length(cmd.drawing_unit)
+    start = cmd.require_number("start_angle", "from")
+    end = cmd.require_number("end_angle", "to")
+    # Una unidad indicada solo al final ("de 0 a 90 grados") aplica a ambos ángulos
+    if start.unit is None:
+        start.unit = end.unit
+    if radius <= 0:
+        raise CommandError("el radio debe ser positivo")
+    return {
+        "center": center.as_dict(cmd.drawing_unit),
+        "radius": radius,
+        "startAngle": start.radians(),
+        "endAngle": end.radians(),
+    }
+
+
+@command_parser.register("create_polyline", ["polilínea", "polilinea", "poligonal", "polígono", "poligono"])
+def _parse_polyline(cmd: ParsedCommand) -> Dict[str, Any]:
+    # "crear polilínea 0,0 1,1 2,0 cerrada" o "polilínea con puntos 0,0; 5,0; 5,5"
+    if len(cmd.points) < 2:
+        raise CommandError("se necesitan al menos dos puntos")
+    closed = cmd.flags.get("closed", cmd.noun in ("poligono",))
+    return {"points": [p.as_dict(cmd.drawing_unit) for p in cmd.points], "closed": closed}
+
+
+@command_parser.register("create_text", ["texto", "etiqueta", "rótulo", "rotulo"])
+def _parse_text(cmd: ParsedCommand) -> Dict[str, Any]:
+    # 'crear texto "Salón" en 2,3 tamaño 14'
+    content = cmd.strings[0] if cmd.strings else " ".join(cmd.words)
+    if not content:
+        raise CommandError("falta el contenido del texto")
+    position = cmd.require_point("at", "_positional")
+    size = cmd.number("size")
+    rotation = cmd.number("rotation")
+    params: Dict[str, Any] = {
+        "position": position.as_dict(cmd.drawing_unit),
+        "content": content,
+        "rotation": rotation.degrees() if rotation else 0,
+    }
+    if size is not None:
+        params["fontSize"] = size.value
+    return params
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.instrumentation import untracked
+from app.db.revision import bump_project_revisions
+from app.db.session import async_session
+from app.models.element import Element
+
+logger = logging.getLogger(__name__)
+
+PendingInsert = Tuple[Dict[str, Any], asyncio.Future]
+
+
+class ElementWriter:
+    """
+    Escritor por worker que agrupa las inserciones de elementos que llegan en
+    pocos milisegundos en un único INSERT multi-fila con RETURNING y un solo commit.
+    Si el lote falla, cada fila se reintenta por separado para aislar el error.
+    """
+
+    def __init__(self, max_delay: float, max_batch: int):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            # Las filas que seguían en la cola de un worker terminado pasan al nuevo
+            pending = self._drain()
+            self._queue = asyncio.Queue()
+            for item in pending:
+                self._queue.put_nowait(item)
+            # La tarea la crea una petición, pero su SQL no debe contarse en ella
+            self._task = asyncio.get_running_loop().create_task(untracked(self._run()))
+
+    def _drain(self) -> List[PendingInsert]:
+        items: List[PendingInsert] = []
+        while self._queue is not None and not self._queue.empty():
+            row, future = self._queue.get_nowait()
+            if not future.done():
+                items.append((row, future))
+        return items
+
+    @staticmethod
+    def _fail(batch: List[PendingInsert], error: BaseException) -> None:
+        for _, future in batch:
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._fail(self._drain(), RuntimeError("El escritor de elementos se ha detenido"))
+
+    async def submit(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Encola una fila (sin revision, la asigna el lote) y espera la fila insertada
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[PendingInsert] = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # Las peticiones canceladas (cliente desconectado) no se insertan
+                batch = [(row, future) for row, future in batch if not future.cancelled()]
+                if batch:
+                    await self._write(batch)
+            except BaseException as e:
+                # El worker termina (cancelación o error inesperado): el lote en curso
+                # no puede quedarse esperando una respuesta que no llegará
+                self._fail(batch, e)
+                raise
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async with async_session() as db:
+            revisions = await bump_project_revisions(db, (row["project_id"] for row in rows))
+            values = [{**row, "revision": revisions[row["project_id"]]} for row in rows]
+            result = await db.execute(
+                insert(Element).returning(*Element.__table__.c, sort_by_parameter_order=True),
+                values,
+            )
+            inserted = [dict(r) for r in result.mappings().all()]
+            await db.commit()
+        return inserted
+
+    async def _write(self, batch: List[PendingInsert]) -> None:
+        try:
+            inserted = await self._insert([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                # Fila individual: el error pertenece solo a esa petición
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            logger.warning("Falló un lote de %d elementos; reintentando fila a fila", len(batch))
+            self.fallbacks += 1
+            for pending in batch:
+                await self._write([pending])
+            return
+
+        self.batches += 1
+        self.rows += len(inserted)
+        for (_, future), element in zip(batch, inserted):
+            if not future.done():
+                future.set_result(element)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+element_writer = ElementWriter(
+    max_delay=settings.GROUP_COMMIT_MAX_DELAY_MS / 1000,
+    max_batch=settings.GROUP_COMMIT_MAX_BATCH,
+)
\ No newline at end of file
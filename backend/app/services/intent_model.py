@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Los números no cambian la intención: se sustituyen para mejorar los aciertos de caché
+_NUMBER_RE = re.compile(r"[-+]?\d+(?:[.,]\d+)*")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_command(command: str) -> str:
+    """
+    Forma canónica de un comando para la caché de intenciones
+    """
+    text = _NUMBER_RE.sub("<n>", command.lower())
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+@dataclass
+class IntentResult:
+    action: str
+    confidence: float
+
+
+class IntentModel:
+    """
+    Clasificador de intenciones con transformers.
+
+    El modelo se carga en segundo plano (el arranque de la API no espera) y la
+    inferencia se hace en un hilo dedicado. Las peticiones concurrentes se agrupan
+    en una cola asíncrona y se resuelven en un único forward pass (micro-batching).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch: int,
+        max_wait: float,
+        quantize: bool,
+        threads: int,
+        cache: TTLCache,
+    ):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.quantize = quantize
+        self.threads = threads
+        self.cache = cache
+        self.ready = False
+        self.error: Optional[str] = None
+        self.batches = 0
+        self.batched_items = 0
+        self._model: Any = None
+        self._tokenizer: Any = None
+        self._labels: Dict[int, str] = {}
+        # Un solo hilo: carga e inferencia nunca compiten entre sí
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intent-model")
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Lanza la carga del modelo y la tarea de agrupación sin bloquear
+        """
+        if self._batcher is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._batcher = loop.create_task(self._run_batcher())
+        loop.run_in_executor(self._executor, self._load)
+
+    async def stop(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        self._executor.shutdown(wait=False)
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            # Importaciones pesadas solo en el hilo de carga
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            torch.set_num_threads(self.threads)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            model.eval()
+            if self.quantize:
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            self._tokenizer = tokenizer
+            self._model = model
+            self._labels = dict(model.config.id2label)
+            self.ready = True
+            logger.info("Modelo de intenciones cargado en %.1fs", time.perf_counter() - start)
+        except Exception as e:  # el analizador por reglas sigue funcionando
+            self.error = str(e)
+            logger.exception("No se pudo cargar el modelo de intenciones")
+
+    def _infer(self, texts: List[str]) -> List[IntentResult]:
+        import torch
+
+        inputs = self._tokenizer(texts, padding=True, truncation=True, max_length=64, return_tensors="pt")
+        with torch.inference_mode():
+            probabilities = self._model(**inputs).logits.softmax(dim=-1)
+        confidences, indices = probabilities.max(dim=-1)
+        return [
+            IntentResult(action=self._labels[int(i)], confidence=float(c))
+            for c, i in zip(confidences.tolist(), indices.tolist())
+        ]
+
+    async def _run_batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in items]
+            try:
+                results = await loop.run_in_executor(self._executor, self._infer, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_items += len(items)
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def predict(self, command: str) -> Optional[IntentResult]:
+        """
+        Intención del comando, o None si el modelo aún no está disponible
+        """
+        if not self.ready:
+            return None
+        key = normalize_command(command)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, future))
+        result = await future
+        self.cache.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "ready": self.ready,
+            "error": self.error,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+            "cache": self.cache.stats(),
+        }
+
+
+intent_model = IntentModel(
+    model_name=settings.NLP_MODEL_NAME,
+    max_batch=settings.NLP_MODEL_MAX_BATCH,
+    max_wait=settings.NLP_MODEL_MAX_WAIT_MS / 1000,
+    quantize=settings.NLP_MODEL_QUANTIZE,
+    threads=settings.NLP_MODEL_THREADS,
+    cache=TTLCache(settings.NLP_INTENT_CACHE_SIZE, settings.NLP_INTENT_CACHE_TTL_SECONDS),
+)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import or_
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.element import Element
+from app.utils.packing import DEFAULT_PACKED_ENCODING, is_packed, pack_coords, polyline_coords
+from app.utils.simplify import decimals_for, douglas_peucker, round_coordinates
+
+
+@dataclass(frozen=True)
+class LevelOfDetail:
+    """
+    Nivel de detalle de una consulta: tolerancia (en unidades del dibujo)
+    redondeada a una potencia de dos para compartir resultados en caché
+    """
+
+    tolerance: float
+    min_size: float
+    decimals: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.tolerance:g}"
+
+
+def level_of_detail(tolerance: Optional[float], zoom: Optional[float]) -> Optional[LevelOfDetail]:
+    """
+    Nivel de detalle a partir de una tolerancia explícita o de un zoom (píxeles por unidad).
+    Devuelve None si no se pidió simplificación.
+    """
+    if tolerance is None and zoom is None:
+        return None
+    if tolerance is None:
+        if zoom <= 0:
+            raise ValueError("zoom debe ser positivo")
+        tolerance = settings.LOD_TOLERANCE_PIXELS / zoom
+    if tolerance <= 0:
+        raise ValueError("tolerance debe ser positiva")
+
+    bucket = 2.0 ** math.floor(math.log2(tolerance))
+    pixel = bucket / settings.LOD_TOLERANCE_PIXELS
+    return LevelOfDetail(
+        tolerance=bucket,
+        min_size=pixel * settings.LOD_MIN_SIZE_PIXELS,
+        decimals=decimals_for(bucket),
+    )
+
+
+def visible_size_filter(lod: LevelOfDetail):
+    """
+    Condición SQL que descarta los elementos cuya caja es menor que el umbral en píxeles.
+    Los elementos sin caja calculada se mantienen.
+    """
+    return or_(
+        Element.min_x.is_(None),
+        Element.max_x - Element.min_x >= lod.min_size,
+        Element.max_y - Element.min_y >= lod.min_size,
+    )
+
+
+def simplify_geometry(element_type: str, geometry: Dict[str, Any], lod: LevelOfDetail) -> Dict[str, Any]:
+    """
+    Geometría simplificada: polilíneas decimadas y coordenadas redondeadas
+    """
+    if element_type == "polyline" and isinstance(geometry, dict) and "points" in geometry:
+        points = geometry["points"]
+        try:
+            coords = douglas_peucker(polyline_coords(points), lod.tolerance)
+        except (KeyError, TypeError, ValueError):
+            return geometry
+        coords = [round(c, lod.decimals) for c in coords]
+        if is_packed(points):
+            simplified = pack_coords(coords, points.get("encoding", DEFAULT_PACKED_ENCODING))
+        else:
+            simplified = [{"x": x, "y": y} for x, y in zip(coords[0::2], coords[1::2])]
+        rest = round_coordinates({k: v for k, v in geometry.items() if k != "points"}, lod.decimals)
+        return {key: simplified if key == "points" else rest[key] for key in geometry}
+    return round_coordinates(geometry, lod.decimals)
+
+
+class GeometrySimplifier:
+    """
+    Simplificación por elemento con caché por (elemento, revisión, tolerancia):
+    la revisión del elemento invalida sus entradas al modificarse
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    def simplify_row(self, row: Mapping[str, Any], lod: LevelOfDetail) -> Dict[str, Any]:
+        key = (row["id"], row["revision"], lod.tolerance)
+        geometry = self.cache.get(key)
+        if geometry is None:
+            geometry = simplify_geometry(row["type"], row["geometry"], lod)
+            self.cache.set(key, geometry)
+        return {**row, "geometry": geometry}
+
+
+geometry_simplifier = GeometrySimplifier(
+    TTLCache(settings.LOD_CACHE_SIZE, settings.LOD_CACHE_TTL_SECONDS)
+)
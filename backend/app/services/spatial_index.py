@@ -0,0 +1,307 @@
+import logging
+import math
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.element import Element
+from app.models.tombstone import Tombstone
+from app.utils.geometry import BBox, geometry_bbox, geometry_distance, snap_points
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+# Columnas necesarias para indexar un elemento
+INDEX_COLUMNS = (Element.id, Element.layer_id, Element.type, Element.geometry)
+
+
+@dataclass
+class IndexedElement:
+    id: int
+    layer_id: int
+    type: str
+    geometry: Dict[str, Any]
+    bbox: Optional[BBox]
+    snap_points: List[Tuple[float, float, str]]
+    cells: List[Cell]
+    vertex_cells: List[Cell]
+
+
+@dataclass
+class SnapHit:
+    x: float
+    y: float
+    kind: str
+    element_id: int
+    distance: float
+
+
+@dataclass
+class ElementHit:
+    element_id: int
+    layer_id: int
+    type: str
+    distance: float
+
+
+class ProjectSpatialIndex:
+    """
+    Índice espacial de un proyecto con una rejilla hash: cada celda guarda los
+    elementos cuya caja la toca y, aparte, los puntos de snap que caen en ella.
+    Los elementos que ocupan demasiadas celdas se guardan en una lista que se
+    recorre siempre.
+    """
+
+    def __init__(self, project_id: int, revision: int, cell_size: float, max_cells_per_element: int):
+        self.project_id = project_id
+        self.revision = revision
+        self.cell_size = cell_size
+        self.max_cells_per_element = max_cells_per_element
+        self.elements: Dict[int, IndexedElement] = {}
+        self.cells: Dict[Cell, Set[int]] = defaultdict(set)
+        self.large: Set[int] = set()
+        self.vertex_cells: Dict[Cell, List[Tuple[float, float, str, int]]] = defaultdict(list)
+        self.weight = 0
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def _cell_range(self, min_x: float, min_y: float, max_x: float, max_y: float) -> Tuple[Cell, Cell]:
+        return self._cell(min_x, min_y), self._cell(max_x, max_y)
+
+    @staticmethod
+    def _cell_count(low: Cell, high: Cell) -> int:
+        return (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+
+    def upsert(self, element_id: int, layer_id: int, element_type: str, geometry: Dict[str, Any]) -> None:
+        self.remove(element_id)
+        bbox = geometry_bbox(element_type, geometry)
+        points = snap_points(element_type, geometry)
+
+        cells: List[Cell] = []
+        if bbox is not None:
+            low, high = self._cell_range(*bbox)
+            if self._cell_count(low, high) > self.max_cells_per_element:
+                self.large.add(element_id)
+            else:
+                cells = [(i, j) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1)]
+                for cell in cells:
+                    self.cells[cell].add(element_id)
+
+        vertex_cells: List[Cell] = []
+        for x, y, kind in points:
+            cell = self._cell(x, y)
+            self.vertex_cells[cell].append((x, y, kind, element_id))
+            vertex_cells.append(cell)
+
+        self.elements[element_id] = IndexedElement(
+            element_id, layer_id, element_type, geometry, bbox, points, cells, vertex_cells
+        )
+        self.weight += 1 + len(cells) + len(points)
+
+    def remove(self, element_id: int) -> None:
+        indexed = self.elements.pop(element_id, None)
+        if indexed is None:
+            return
+        self.large.discard(element_id)
+        for cell in indexed.cells:
+            members = self.cells[cell]
+            members.discard(element_id)
+            if not members:
+                del self.cells[cell]
+        for cell in set(indexed.vertex_cells):
+            remaining = [v for v in self.vertex_cells[cell] if v[3] != element_id]
+            if remaining:
+                self.vertex_cells[cell] = remaining
+            else:
+                del self.vertex_cells[cell]
+        self.weight -= 1 + len(indexed.cells) + len(indexed.snap_points)
+
+    def _candidates(self, x: float, y: float, tolerance: float) -> Iterable[int]:
+        low, high = self._cell_range(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        # Ventana muy grande respecto al índice: más barato recorrer todos los elementos
+        if self._cell_count(low, high) > len(self.cells):
+            return self.elements.keys()
+        found = set(self.large)
+        for i in range(low[0], high[0] + 1):
+            for j in range(low[1], high[1] + 1):
+                found.update(self.cells.get((i, j), ()))
+        return found
+
+    def nearest_vertex(
+        self,
+        x: float,
+        y: float,
+        tolerance: float,
+        kinds: Optional[Set[str]] = None,
+        exclude_layers: Optional[Set[int]] = None,
+    ) -> Optional[SnapHit]:
+        """
+        Punto de snap más cercano a (x, y) dentro de la tolerancia
+        """
+        low, high = self._cell_range(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        if self._cell_count(low, high) > len(self.vertex_cells):
+            buckets = self.vertex_cells.values()
+        else:
+            buckets = (
+                self.vertex_cells.get((i, j), ())
+                for i in range(low[0], high[0] + 1)
+                for j in range(low[1], high[1] + 1)
+            )
+
+        best: Optional[SnapHit] = None
+        for bucket in buckets:
+            for vx, vy, kind, element_id in bucket:
+                if kinds and kind not in kinds:
+                    continue
+                distance = math.hypot(vx - x, vy - y)
+                if distance > tolerance or (best is not None and distance >= best.distance):
+                    continue
+                if exclude_layers and self.elements[element_id].layer_id in exclude_layers:
+                    continue
+                best = SnapHit(vx, vy, kind, element_id, distance)
+        return best
+
+    def hit_test(
+        self,
+        x: float,
+        y: float,
+        tolerance: float,
+        limit: int = 10,
+        exclude_layers: Optional[Set[int]] = None,
+    ) -> List[ElementHit]:
+        """
+        Elementos cuyo trazo pasa a menos de la tolerancia de (x, y), del más cercano al más lejano
+        """
+        hits: List[ElementHit] = []
+        for element_id in self._candidates(x, y, tolerance):
+            indexed = self.elements[element_id]
+            if exclude_layers and indexed.layer_id in exclude_layers:
+                continue
+            bbox = indexed.bbox
+            if bbox is None or (
+                x + tolerance < bbox[0] or x - tolerance > bbox[2]
+                or y + tolerance < bbox[1] or y - tolerance > bbox[3]
+            ):
+                continue
+            distance = geometry_distance(indexed.type, indexed.geometry, x, y)
+            if distance is not None and distance <= tolerance:
+                hits.append(ElementHit(element_id, indexed.layer_id, indexed.type, distance))
+        hits.sort(key=lambda hit: (hit.distance, -hit.element_id))
+        return hits[:limit]
+
+
+def _cell_size_for(rows: List[Any]) -> float:
+    """
+    Tamaño de celda para que haya del orden de un elemento por celda
+    """
+    boxes = [b for b in (geometry_bbox(row.type, row.geometry) for row in rows) if b is not None]
+    if not boxes:
+        return settings.SPATIAL_INDEX_DEFAULT_CELL_SIZE
+    width = max(b[2] for b in boxes) - min(b[0] for b in boxes)
+    height = max(b[3] for b in boxes) - min(b[1] for b in boxes)
+    size = max(width, height) / math.sqrt(len(boxes))
+    return size if size > 0 else settings.SPATIAL_INDEX_DEFAULT_CELL_SIZE
+
+
+class SpatialIndexCache:
+    """
+    Índices de los proyectos más usados, acotados por su peso total (entradas
+    indexadas) con expulsión LRU. Cada índice se pone al día con los elementos
+    escritos y las lápidas posteriores a su revisión, sin reconstruirse.
+    """
+
+    def __init__(self, max_weight: int, max_projects: int, max_cells_per_element: int):
+        self.max_weight = max_weight
+        self.max_projects = max_projects
+        self.max_cells_per_element = max_cells_per_element
+        self.builds = 0
+        self.updates = 0
+        self.hits = 0
+        self._indexes: "OrderedDict[int, ProjectSpatialIndex]" = OrderedDict()
+
+    @property
+    def weight(self) -> int:
+        return sum(index.weight for index in self._indexes.values())
+
+    async def get(self, db: AsyncSession, project_id: int, revision: int) -> ProjectSpatialIndex:
+        """
+        Índice del proyecto al día con la revisión indicada
+        """
+        index = self._indexes.get(project_id)
+        if index is None or index.revision > revision:
+            index = await self._build(db, project_id, revision)
+        elif index.revision < revision:
+            await self._catch_up(db, index, revision)
+            self.updates += 1
+        else:
+            self.hits += 1
+        self._store(index)
+        return index
+
+    async def _build(self, db: AsyncSession, project_id: int, revision: int) -> ProjectSpatialIndex:
+        result = await db.execute(select(*INDEX_COLUMNS).where(Element.project_id == project_id))
+        rows = result.all()
+        index = ProjectSpatialIndex(project_id, revision, _cell_size_for(rows), self.max_cells_per_element)
+        for row in rows:
+            index.upsert(row.id, row.layer_id, row.type, row.geometry)
+        self.builds += 1
+        return index
+
+    async def _catch_up(self, db: AsyncSession, index: ProjectSpatialIndex, revision: int) -> None:
+        # Reaplicar cambios es idempotente: da igual leer alguno posterior a revision
+        since = index.revision
+        changed = await db.execute(
+            select(*INDEX_COLUMNS).where(Element.project_id == index.project_id, Element.revision > since)
+        )
+        for row in changed:
+            index.upsert(row.id, row.layer_id, row.type, row.geometry)
+        deleted = await db.execute(
+            select(Tombstone.entity_id).where(
+                Tombstone.project_id == index.project_id,
+                Tombstone.entity_type == "element",
+                Tombstone.revision > since,
+            )
+        )
+        for element_id in deleted.scalars():
+            index.remove(element_id)
+        index.revision = revision
+
+    def _store(self, index: ProjectSpatialIndex) -> None:
+        self._indexes[index.project_id] = index
+        self._indexes.move_to_end(index.project_id)
+        if index.weight > self.max_weight:
+            # Un proyecto mayor que todo el presupuesto se usa una vez y no se guarda
+            logger.warning(
+                "Índice espacial del proyecto %d demasiado grande para la caché (%d entradas)",
+                index.project_id, index.weight,
+            )
+            del self._indexes[index.project_id]
+            return
+        while len(self._indexes) > self.max_projects or self.weight > self.max_weight:
+            self._indexes.popitem(last=False)
+
+    def invalidate(self, project_id: int) -> None:
+        self._indexes.pop(project_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "projects": len(self._indexes),
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "builds": self.builds,
+            "updates": self.updates,
+            "hits": self.hits,
+        }
+
+
+spatial_indexes = SpatialIndexCache(
+    max_weight=settings.SPATIAL_INDEX_MAX_WEIGHT,
+    max_projects=settings.SPATIAL_INDEX_MAX_PROJECTS,
+    max_cells_per_element=settings.SPATIAL_INDEX_MAX_CELLS_PER_ELEMENT,
+)
@@ -0,0 +1,424 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import and_, case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.negotiation import dump_json
+from app.models.element import Element
+from app.models.tombstone import Tombstone
+from app.utils.geometry import outline
+from app.utils.simplify import douglas_peucker
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[float, float, float, float]
+PointXY = Tuple[float, float]
+
+TILE_COLUMNS = (Element.id, Element.layer_id, Element.type, Element.geometry, Element.style)
+
+# Niveles de zoom admitidos (negativos: teselas mayores que la de zoom 0)
+MIN_ZOOM = settings.TILE_MIN_ZOOM
+MAX_ZOOM = settings.TILE_MAX_ZOOM
+
+
+def _xy(point: Dict[str, Any]) -> PointXY:
+    return float(point["x"]), float(point["y"])
+
+
+@dataclass(frozen=True)
+class TileKey:
+    project_id: int
+    z: int
+    x: int
+    y: int
+
+
+@dataclass
+class CachedTile:
+    # Revisión con la que se generó el contenido y última revisión comprobada
+    content_revision: int
+    checked_revision: int
+    element_ids: FrozenSet[int]
+    payload: Dict[str, Any]
+
+
+def tile_size(z: int) -> float:
+    """
+    Lado de una tesela en unidades del dibujo: TILE_ZOOM0_SIZE a zoom 0, la mitad en cada nivel
+    """
+    return settings.TILE_ZOOM0_SIZE / (2.0 ** z)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Box:
+    size = tile_size(z)
+    return x * size, y * size, (x + 1) * size, (y + 1) * size
+
+
+def _clip_segment(a: PointXY, b: PointXY, box: Box) -> Optional[Tuple[PointXY, PointXY, bool]]:
+    """
+    Recorte de Liang-Barsky. Devuelve el tramo visible y si conserva el punto inicial.
+    """
+    (ax, ay), (bx, by) = a, b
+    dx, dy = bx - ax, by - ay
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, ax - box[0]), (dx, box[2] - ax), (-dy, ay - box[1]), (dy, box[3] - ay)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    return (ax + t0 * dx, ay + t0 * dy), (ax + t1 * dx, ay + t1 * dy), t0 == 0.0
+
+
+def clip_path(points: List[PointXY], closed: bool, box: Box) -> Tuple[List[List[PointXY]], bool]:
+    """
+    Recorta un trazo a la caja. Devuelve los tramos visibles y si el trazo cerrado
+    quedó entero (sigue siendo cerrado).
+    """
+    if len(points) < 2:
+        return [], False
+    segments = list(zip(points, points[1:]))
+    if closed and len(points) > 2:
+        segments.append((points[-1], points[0]))
+
+    parts: List[List[PointXY]] = []
+    continuing = False
+    whole = True
+    for a, b in segments:
+        clipped = _clip_segment(a, b, box)
+        if clipped is None:
+            continuing = whole = False
+            continue
+        start, end, keeps_start = clipped
+        if end != b:
+            whole = False
+        if continuing and keeps_start:
+            parts[-1].append(end)
+        else:
+            if parts:
+                whole = False
+            parts.append([start, end])
+        continuing = end == b
+
+    if closed and whole and parts:
+        # Polígono completo: el último punto repite el primero
+        return [parts[0][:-1]], True
+    return parts, False
+
+
+class TileEncoder:
+    """
+    Codifica las geometrías de una tesela en enteros relativos a su origen
+    (0..TILE_EXTENT) con los trazos recortados, simplificados y en deltas
+    """
+
+    def __init__(self, z: int, x: int, y: int):
+        self.z, self.x, self.y = z, x, y
+        self.extent = settings.TILE_EXTENT
+        self.size = tile_size(z)
+        self.scale = self.extent / self.size
+        self.origin_x, self.origin_y, max_x, max_y = tile_bounds(z, x, y)
+        buffer = settings.TILE_BUFFER / self.scale
+        self.clip_box = (self.origin_x - buffer, self.origin_y - buffer, max_x + buffer, max_y + buffer)
+
+    def _q(self, point: PointXY) -> Tuple[int, int]:
+        return round((point[0] - self.origin_x) * self.scale), round((point[1] - self.origin_y) * self.scale)
+
+    def _encode_part(self, part: List[PointXY]) -> Optional[List[int]]:
+        flat = [c for point in part for c in point]
+        simplified = douglas_peucker(flat, 1 / self.scale)
+        coords: List[int] = []
+        last: Optional[Tuple[int, int]] = None
+        for px, py in zip(simplified[0::2], simplified[1::2]):
+            qx, qy = self._q((px, py))
+            if last is None:
+                coords += [qx, qy]
+            elif (qx, qy) != last:
+                coords += [qx - last[0], qy - last[1]]
+            last = (qx, qy)
+        return coords if len(coords) >= 4 else None
+
+    def _path(self, points: List[PointXY], closed: bool) -> Optional[Dict[str, Any]]:
+        parts, closed = clip_path(points, closed, self.clip_box)
+        encoded = [coords for coords in (self._encode_part(part) for part in parts) if coords]
+        if not encoded:
+            return None
+        return {"parts": encoded, "closed": closed}
+
+    def encode_geometry(self, element_type: str, geometry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = outline(element_type, geometry)
+        if path is not None:
+            return self._path(*path)
+        if element_type in ("circle", "arc"):
+            encoded = {
+                "center": list(self._q(_xy(geometry["center"]))),
+                "radius": round(abs(float(geometry["radius"])) * self.scale),
+            }
+            if element_type == "arc":
+                encoded["startAngle"] = float(geometry["startAngle"])
+                encoded["endAngle"] = float(geometry["endAngle"])
+            return encoded
+        if element_type == "text":
+            return {
+                "position": list(self._q(_xy(geometry["position"]))),
+                "content": geometry.get("content", ""),
+                "fontSize": round(float(geometry.get("fontSize") or 12) * self.scale, 2),
+                "rotation": float(geometry.get("rotation") or 0),
+                "horizontalAlign": geometry.get("horizontalAlign", "left"),
+                "verticalAlign": geometry.get("verticalAlign", "middle"),
+            }
+        return None
+
+    def encode_element(self, row: Any) -> Optional[Dict[str, Any]]:
+        try:
+            geometry = self.encode_geometry(row.type, row.geometry)
+        except (KeyError, TypeError, ValueError):
+            return None
+        if geometry is None:
+            return None
+        return {"id": row.id, "layer_id": row.layer_id, "type": row.type, "style": row.style, "geometry": geometry}
+
+
+class TileDiskCache:
+    """
+    Copia en disco de las teselas: {dir}/{proyecto}/{z}/{x}/{y}.json
+
+    El tamaño total se limita a max_bytes borrando las teselas usadas hace más tiempo.
+    El índice se construye al primer uso recorriendo el directorio. Los métodos hacen
+    E/S bloqueante y se llaman desde un executor.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[Path, int]"] = None
+        self._bytes = 0
+
+    def _path(self, key: TileKey) -> Path:
+        return self.directory / str(key.project_id) / str(key.z) / str(key.x) / f"{key.y}.json"
+
+    def _index(self) -> "OrderedDict[Path, int]":
+        # Llamar con el cerrojo tomado
+        if self._entries is None:
+            found = []
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = Path(root) / name
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    if name.endswith(".tmp"):
+                        # Restos de una escritura interrumpida
+                        path.unlink(missing_ok=True)
+                        continue
+                    found.append((stat.st_mtime, path, stat.st_size))
+            found.sort(key=lambda item: item[0])
+            self._entries = OrderedDict((path, size) for _, path, size in found)
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    def _evict(self, entries: "OrderedDict[Path, int]") -> None:
+        while self._bytes > self.max_bytes and entries:
+            path, size = entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                logger.warning("No se pudo borrar la tesela en disco: %s", path)
+
+    def load(self, key: TileKey) -> Optional[CachedTile]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Tesela en disco ilegible: %s", path)
+            return None
+        with self._lock:
+            entries = self._index()
+            if path in entries:
+                entries.move_to_end(path)
+        return CachedTile(
+            content_revision=data["content_revision"],
+            checked_revision=data["checked_revision"],
+            element_ids=frozenset(data["element_ids"]),
+            payload=data["payload"],
+        )
+
+    def save(self, key: TileKey, tile: CachedTile) -> None:
+        path = self._path(key)
+        body = dump_json({
+            "content_revision": tile.content_revision,
+            "checked_revision": tile.checked_revision,
+            "element_ids": sorted(tile.element_ids),
+            "payload": tile.payload,
+        })
+        if len(body) > self.max_bytes:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: un lector nunca ve un fichero a medias
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+        with self._lock:
+            entries = self._index()
+            self._bytes += len(body) - entries.pop(path, 0)
+            entries[path] = len(body)
+            self._evict(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"files": len(self._entries or ()), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class TileService:
+    """
+    Teselas vectoriales por proyecto con caché en memoria y en disco.
+
+    Una tesela guardada sigue valiendo para revisiones posteriores mientras ningún
+    cambio la toque: se comprueba con los elementos escritos y las lápidas desde
+    la última revisión comprobada, y solo si alguno la toca se vuelve a generar.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[TileDiskCache]):
+        self.memory = memory
+        self.disk = disk
+        self.renders = 0
+        self.revalidations = 0
+
+    async def get(self, db: AsyncSession, key: TileKey, revision: int) -> CachedTile:
+        tile = self.memory.get(key)
+        if tile is None and self.disk is not None:
+            tile = await asyncio.get_running_loop().run_in_executor(None, self.disk.load, key)
+        if tile is not None and tile.checked_revision > revision:
+            tile = None  # caché de otra versión del proyecto (p. ej. restaurado)
+
+        if tile is not None and tile.checked_revision < revision:
+            if await self._touched(db, key, tile, revision):
+                tile = None
+            else:
+                tile.checked_revision = revision
+                self.revalidations += 1
+                await self._store(key, tile)
+
+        if tile is None:
+            tile = await self._render(db, key, revision)
+            await self._store(key, tile)
+        else:
+            self.memory.set(key, tile)
+        return tile
+
+    async def _store(self, key: TileKey, tile: CachedTile) -> None:
+        self.memory.set(key, tile)
+        if self.disk is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.disk.save, key, tile)
+            except OSError:
+                logger.exception("No se pudo guardar la tesela en disco")
+
+    async def _touched(self, db: AsyncSession, key: TileKey, tile: CachedTile, revision: int) -> bool:
+        """
+        True si algún cambio posterior a la revisión comprobada afecta a la tesela:
+        un elemento que ahora la cruza o que estaba en ella (movido o eliminado)
+        """
+        min_x, min_y, max_x, max_y = TileEncoder(key.z, key.x, key.y).clip_box
+        changed = await db.execute(
+            select(Element.id, Element.min_x, Element.min_y, Element.max_x, Element.max_y).where(
+                Element.project_id == key.project_id,
+                Element.revision > tile.checked_revision,
+            )
+        )
+        for row in changed:
+            if row.id in tile.element_ids:
+                return True
+            if row.min_x is not None and (
+                row.max_x >= min_x and row.min_x <= max_x and row.max_y >= min_y and row.min_y <= max_y
+            ):
+                return True
+        deleted = await db.execute(
+            select(Tombstone.entity_id).where(
+                Tombstone.project_id == key.project_id,
+                Tombstone.entity_type == "element",
+                Tombstone.revision > tile.checked_revision,
+            )
+        )
+        return any(element_id in tile.element_ids for element_id in deleted.scalars())
+
+    async def _render(self, db: AsyncSession, key: TileKey, revision: int) -> CachedTile:
+        encoder = TileEncoder(key.z, key.x, key.y)
+        min_x, min_y, max_x, max_y = encoder.clip_box
+        # Elementos menores que una unidad de la tesela no se ven a este zoom
+        min_size = settings.LOD_MIN_SIZE_PIXELS / encoder.scale
+        width, height = Element.max_x - Element.min_x, Element.max_y - Element.min_y
+        query = (
+            select(*TILE_COLUMNS)
+            .where(
+                Element.project_id == key.project_id,
+                and_(
+                    Element.max_x >= min_x,
+                    Element.min_x <= max_x,
+                    Element.max_y >= min_y,
+                    Element.min_y <= max_y,
+                ),
+                (width >= min_size) | (height >= min_size),
+            )
+            # Si hay más elementos que el límite se descartan los más pequeños, no los de id mayor
+            # (CASE en lugar de greatest(), que SQLite no tiene)
+            .order_by(case((width > height, width), else_=height).desc(), Element.id)
+            .limit(settings.TILE_MAX_ELEMENTS + 1)
+        )
+        rows = (await db.execute(query)).all()
+        truncated = len(rows) > settings.TILE_MAX_ELEMENTS
+        rows = rows[:settings.TILE_MAX_ELEMENTS]
+        elements = [e for e in (encoder.encode_element(row) for row in rows) if e is not None]
+        self.renders += 1
+        payload = {
+            "z": key.z,
+            "x": key.x,
+            "y": key.y,
+            "extent": encoder.extent,
+            "size": encoder.size,
+            "origin": [encoder.origin_x, encoder.origin_y],
+            "revision": revision,
+            "elements": elements,
+            "truncated": truncated,
+        }
+        return CachedTile(
+            content_revision=revision,
+            checked_revision=revision,
+            element_ids=frozenset(e["id"] for e in elements),
+            payload=payload,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"renders": self.renders, "revalidations": self.revalidations, "memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+tile_service = TileService(
+    TTLCache(settings.TILE_CACHE_SIZE, settings.TILE_CACHE_TTL_SECONDS),
+    TileDiskCache(settings.TILE_CACHE_DIR, settings.TILE_CACHE_DIR_MAX_BYTES) if settings.TILE_CACHE_DIR else None,
+)
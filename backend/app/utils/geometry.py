@@ -0,0 +1,379 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.packing import polyline_coords
+
+# Caja envolvente (min_x, min_y, max_x, max_y)
+BBox = Tuple[float, float, float, float]
+
+# Ancho aproximado de un carácter respecto al tamaño de fuente
+# (mismo factor que usa el frontend para el marco de selección de textos)
+TEXT_CHAR_WIDTH_FACTOR = 0.6
+
+
+def _point(data: Dict[str, Any]) -> Tuple[float, float]:
+    return float(data["x"]), float(data["y"])
+
+
+def _bounds(points: List[Tuple[float, float]]) -> Optional[BBox]:
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _rotate(
+    points: List[Tuple[float, float]], angle_deg: float, cx: float, cy: float
+) -> List[Tuple[float, float]]:
+    """
+    Rota una lista de puntos alrededor de (cx, cy), ángulo en grados
+    """
+    if not angle_deg:
+        return points
+    angle = math.radians(angle_deg)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    return [
+        (
+            cx + (x - cx) * cos_a - (y - cy) * sin_a,
+            cy + (x - cx) * sin_a + (y - cy) * cos_a,
+        )
+        for x, y in points
+    ]
+
+
+def _line_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    return _bounds([_point(geometry["start"]), _point(geometry["end"])])
+
+
+def _polyline_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    # Lista de objetos o puntos empaquetados: siempre como array de coordenadas
+    coords = polyline_coords(geometry["points"])
+    if not coords:
+        return None
+    xs, ys = coords[0::2], coords[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _rectangle_corners(geometry: Dict[str, Any]) -> List[Tuple[float, float]]:
+    x, y = _point(geometry["topLeft"])
+    width, height = float(geometry["width"]), float(geometry["height"])
+    corners = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+    # El frontend rota el rectángulo alrededor de su centro
+    rotation = float(geometry.get("rotation") or 0)
+    return _rotate(corners, rotation, x + width / 2, y + height / 2)
+
+
+def _rectangle_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    return _bounds(_rectangle_corners(geometry))
+
+
+def _circle_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    cx, cy = _point(geometry["center"])
+    r = abs(float(geometry["radius"]))
+    return cx - r, cy - r, cx + r, cy + r
+
+
+def _arc_sweep(geometry: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    Ángulo inicial y barrido (antihorario, en radianes) de un arco
+    """
+    start = float(geometry["startAngle"])
+    end = float(geometry["endAngle"])
+    sweep = (end - start) % (2 * math.pi)
+    if sweep == 0 and end != start:
+        sweep = 2 * math.pi
+    return start, sweep
+
+
+def _arc_quadrants(start: float, sweep: float) -> List[float]:
+    # Ángulos cardinales contenidos en el barrido
+    angles = []
+    quadrant = math.ceil(start / (math.pi / 2)) * (math.pi / 2)
+    while quadrant < start + sweep:
+        angles.append(quadrant)
+        quadrant += math.pi / 2
+    return angles
+
+
+def _arc_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    cx, cy = _point(geometry["center"])
+    r = abs(float(geometry["radius"]))
+    start, sweep = _arc_sweep(geometry)
+
+    # Extremos del arco más los puntos cardinales contenidos en el barrido
+    angles = [start, start + sweep] + _arc_quadrants(start, sweep)
+    return _bounds([(cx + r * math.cos(a), cy + r * math.sin(a)) for a in angles])
+
+
+def _text_corners(geometry: Dict[str, Any]) -> List[Tuple[float, float]]:
+    x, y = _point(geometry["position"])
+    font_size = float(geometry.get("fontSize") or 12)
+    width = len(geometry.get("content") or "") * font_size * TEXT_CHAR_WIDTH_FACTOR
+
+    h_align = geometry.get("horizontalAlign", "left")
+    if h_align == "center":
+        left = x - width / 2
+    elif h_align == "right":
+        left = x - width
+    else:
+        left = x
+
+    v_align = geometry.get("verticalAlign", "middle")
+    if v_align == "top":
+        top = y
+    elif v_align == "bottom":
+        top = y - font_size
+    else:
+        top = y - font_size / 2
+
+    corners = [
+        (left, top),
+        (left + width, top),
+        (left + width, top + font_size),
+        (left, top + font_size),
+    ]
+    # El frontend rota el texto alrededor de su posición
+    rotation = float(geometry.get("rotation") or 0)
+    return _rotate(corners, rotation, x, y)
+
+
+def _text_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    return _bounds(_text_corners(geometry))
+
+
+_BBOX_FUNCTIONS = {
+    "line": _line_bbox,
+    "polyline": _polyline_bbox,
+    "rectangle": _rectangle_bbox,
+    "circle": _circle_bbox,
+    "arc": _arc_bbox,
+    "text": _text_bbox,
+}
+
+
+def geometry_bbox(element_type: str, geometry: Dict[str, Any]) -> Optional[BBox]:
+    """
+    Calcula la caja envolvente de una geometría según su tipo.
+    Devuelve None si el tipo no es conocido o la geometría es incompleta.
+    """
+    func = _BBOX_FUNCTIONS.get(element_type)
+    if func is None or not geometry:
+        return None
+    try:
+        return func(geometry)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def bbox_values(element_type: str, geometry: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Columnas de caja envolvente de un elemento listas para asignar al modelo
+    """
+    bbox = geometry_bbox(element_type, geometry)
+    if bbox is None:
+        return {"min_x": None, "min_y": None, "max_x": None, "max_y": None}
+    min_x, min_y, max_x, max_y = bbox
+    return {"min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
+
+
+# Punto de referencia para el snap: (x, y, tipo)
+SnapPoint = Tuple[float, float, str]
+
+
+def _polyline_points(geometry: Dict[str, Any]) -> List[Tuple[float, float]]:
+    coords = polyline_coords(geometry["points"])
+    return list(zip(coords[0::2], coords[1::2]))
+
+
+def _midpoints(points: List[Tuple[float, float]], closed: bool) -> List[Tuple[float, float]]:
+    pairs = list(zip(points, points[1:]))
+    if closed and len(points) > 2:
+        pairs.append((points[-1], points[0]))
+    return [((ax + bx) / 2, (ay + by) / 2) for (ax, ay), (bx, by) in pairs]
+
+
+def _line_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    points = [_point(geometry["start"]), _point(geometry["end"])]
+    return [(x, y, "endpoint") for x, y in points] + [(x, y, "midpoint") for x, y in _midpoints(points, False)]
+
+
+def _polyline_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    points = _polyline_points(geometry)
+    closed = bool(geometry.get("closed"))
+    return [(x, y, "endpoint") for x, y in points] + [(x, y, "midpoint") for x, y in _midpoints(points, closed)]
+
+
+def _rectangle_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    corners = _rectangle_corners(geometry)
+    cx = sum(x for x, _ in corners) / 4
+    cy = sum(y for _, y in corners) / 4
+    return (
+        [(x, y, "endpoint") for x, y in corners]
+        + [(x, y, "midpoint") for x, y in _midpoints(corners, True)]
+        + [(cx, cy, "center")]
+    )
+
+
+def _circle_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    cx, cy = _point(geometry["center"])
+    r = abs(float(geometry["radius"]))
+    return [(cx, cy, "center"), (cx + r, cy, "quadrant"), (cx, cy + r, "quadrant"),
+            (cx - r, cy, "quadrant"), (cx, cy - r, "quadrant")]
+
+
+def _arc_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    cx, cy = _point(geometry["center"])
+    r = abs(float(geometry["radius"]))
+    start, sweep = _arc_sweep(geometry)
+
+    def at(angle: float, kind: str) -> SnapPoint:
+        return cx + r * math.cos(angle), cy + r * math.sin(angle), kind
+
+    return (
+        [(cx, cy, "center"), at(start, "endpoint"), at(start + sweep, "endpoint"), at(start + sweep / 2, "midpoint")]
+        + [at(a, "quadrant") for a in _arc_quadrants(start, sweep)]
+    )
+
+
+def _text_snap_points(geometry: Dict[str, Any]) -> List[SnapPoint]:
+    x, y = _point(geometry["position"])
+    return [(x, y, "insertion")]
+
+
+_SNAP_FUNCTIONS = {
+    "line": _line_snap_points,
+    "polyline": _polyline_snap_points,
+    "rectangle": _rectangle_snap_points,
+    "circle": _circle_snap_points,
+    "arc": _arc_snap_points,
+    "text": _text_snap_points,
+}
+
+
+def snap_points(element_type: str, geometry: Dict[str, Any]) -> List[SnapPoint]:
+    """
+    Puntos notables de una geometría (extremos, puntos medios, centros, cuadrantes)
+    """
+    func = _SNAP_FUNCTIONS.get(element_type)
+    if func is None or not geometry:
+        return []
+    try:
+        return func(geometry)
+    except (KeyError, TypeError, ValueError):
+        return []
+
+
+def _segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _path_distance(points: List[Tuple[float, float]], closed: bool, x: float, y: float) -> float:
+    if len(points) == 1:
+        return math.hypot(x - points[0][0], y - points[0][1])
+    pairs = list(zip(points, points[1:]))
+    if closed and len(points) > 2:
+        pairs.append((points[-1], points[0]))
+    return min(_segment_distance(x, y, ax, ay, bx, by) for (ax, ay), (bx, by) in pairs)
+
+
+def _inside_polygon(points: List[Tuple[float, float]], x: float, y: float) -> bool:
+    inside = False
+    for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+        if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+            inside = not inside
+    return inside
+
+
+def _line_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    return _path_distance([_point(geometry["start"]), _point(geometry["end"])], False, x, y)
+
+
+def _polyline_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    return _path_distance(_polyline_points(geometry), bool(geometry.get("closed")), x, y)
+
+
+def _rectangle_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    # Solo el contorno: el relleno no se tiene en cuenta para seleccionar
+    return _path_distance(_rectangle_corners(geometry), True, x, y)
+
+
+def _circle_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    cx, cy = _point(geometry["center"])
+    return abs(math.hypot(x - cx, y - cy) - abs(float(geometry["radius"])))
+
+
+def _arc_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    cx, cy = _point(geometry["center"])
+    r = abs(float(geometry["radius"]))
+    start, sweep = _arc_sweep(geometry)
+    if (math.atan2(y - cy, x - cx) - start) % (2 * math.pi) <= sweep:
+        return abs(math.hypot(x - cx, y - cy) - r)
+    # Fuera del barrido: el punto más cercano es uno de los extremos
+    return min(
+        math.hypot(x - (cx + r * math.cos(a)), y - (cy + r * math.sin(a)))
+        for a in (start, start + sweep)
+    )
+
+
+def _text_distance(geometry: Dict[str, Any], x: float, y: float) -> float:
+    # El texto se selecciona por su marco: dentro la distancia es cero
+    corners = _text_corners(geometry)
+    if _inside_polygon(corners, x, y):
+        return 0.0
+    return _path_distance(corners, True, x, y)
+
+
+_DISTANCE_FUNCTIONS = {
+    "line": _line_distance,
+    "polyline": _polyline_distance,
+    "rectangle": _rectangle_distance,
+    "circle": _circle_distance,
+    "arc": _arc_distance,
+    "text": _text_distance,
+}
+
+
+def geometry_distance(element_type: str, geometry: Dict[str, Any], x: float, y: float) -> Optional[float]:
+    """
+    Distancia de (x, y) al trazo de una geometría, o None si no se puede calcular
+    """
+    func = _DISTANCE_FUNCTIONS.get(element_type)
+    if func is None or not geometry:
+        return None
+    try:
+        return func(geometry, x, y)
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def outline(element_type: str, geometry: Dict[str, Any]) -> Optional[Tuple[List[Tuple[float, float]], bool]]:
+    """
+    Vértices del contorno de las geometrías formadas por segmentos (línea, polilínea,
+    rectángulo) y si el contorno es cerrado. None para el resto de tipos.
+    """
+    if element_type == "line":
+        return [_point(geometry["start"]), _point(geometry["end"])], False
+    if element_type == "polyline":
+        return _polyline_points(geometry), bool(geometry.get("closed"))
+    if element_type == "rectangle":
+        return _rectangle_corners(geometry), True
+    return None
+
+
+def parse_bbox(value: str) -> BBox:
+    """
+    Interpreta un parámetro "minx,miny,maxx,maxy"
+    """
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox debe tener el formato minx,miny,maxx,maxy")
+    min_x, min_y, max_x, max_y = (float(p) for p in parts)
+    if min_x > max_x or min_y > max_y:
+        raise ValueError("bbox con mínimos mayores que máximos")
+    return min_x, min_y, max_x, max_y
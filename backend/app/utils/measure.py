@@ -0,0 +1,206 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.packing import is_packed, unpack_coords
+
+TWO_PI = 2 * math.pi
+METRICS = ("count", "length", "perimeter", "area")
+
+
+def _xy(point: Dict[str, Any]) -> Tuple[float, float]:
+    return float(point["x"]), float(point["y"])
+
+
+def polyline_array(points: Any) -> np.ndarray:
+    """
+    Vértices (n, 2) de una polilínea; los puntos empaquetados se leen sin copiar por punto
+    """
+    if is_packed(points):
+        # Mismo decodificador que el resto del proyecto; array.array expone su búfer a NumPy
+        coords = unpack_coords(points)
+        return np.frombuffer(coords, dtype=coords.typecode).astype(np.float64).reshape(-1, 2)
+    return np.array([_xy(p) for p in points], dtype=np.float64).reshape(-1, 2)
+
+
+class GeometryBatch:
+    """
+    Geometrías de un proyecto agrupadas por tipo en arrays de coordenadas.
+    Cada fila conserva su grupo (índice de capa) para agregar con bincount.
+    """
+
+    def __init__(self) -> None:
+        self.lines: List[Tuple[float, float, float, float]] = []
+        self.line_groups: List[int] = []
+        self.rectangles: List[Tuple[float, float, float, float, float]] = []
+        self.rectangle_groups: List[int] = []
+        self.circles: List[Tuple[float, float, float]] = []
+        self.circle_groups: List[int] = []
+        self.arcs: List[Tuple[float, float, float, float, float]] = []
+        self.arc_groups: List[int] = []
+        self.polylines: List[np.ndarray] = []
+        self.polyline_closed: List[bool] = []
+        self.polyline_groups: List[int] = []
+        # Textos y demás tipos: solo cuentan y aportan su caja ya calculada
+        self.other_types: List[str] = []
+        self.other_groups: List[int] = []
+        self.other_boxes: List[Tuple[float, float, float, float]] = []
+        self.invalid = 0
+
+    def add(self, group: int, element_type: str, geometry: Dict[str, Any], bbox: Optional[Sequence[float]]) -> None:
+        try:
+            if element_type == "line":
+                self.lines.append(_xy(geometry["start"]) + _xy(geometry["end"]))
+                self.line_groups.append(group)
+            elif element_type == "rectangle":
+                x, y = _xy(geometry["topLeft"])
+                self.rectangles.append((
+                    x, y, float(geometry["width"]), float(geometry["height"]),
+                    math.radians(float(geometry.get("rotation") or 0)),
+                ))
+                self.rectangle_groups.append(group)
+            elif element_type == "circle":
+                self.circles.append(_xy(geometry["center"]) + (abs(float(geometry["radius"])),))
+                self.circle_groups.append(group)
+            elif element_type == "arc":
+                self.arcs.append(_xy(geometry["center"]) + (
+                    abs(float(geometry["radius"])), float(geometry["startAngle"]), float(geometry["endAngle"]),
+                ))
+                self.arc_groups.append(group)
+            elif element_type == "polyline":
+                vertices = polyline_array(geometry["points"])
+                if len(vertices) == 0:
+                    raise ValueError("polilínea sin puntos")
+                self.polylines.append(vertices)
+                self.polyline_closed.append(bool(geometry.get("closed")))
+                self.polyline_groups.append(group)
+            else:
+                self.other_types.append(element_type)
+                self.other_groups.append(group)
+                if bbox is not None and None not in bbox:
+                    self.other_boxes.append(tuple(bbox))
+        except (KeyError, TypeError, ValueError):
+            self.invalid += 1
+
+
+def _sum_by_group(values: np.ndarray, groups: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(groups, weights=values, minlength=size)
+
+
+def _extend(extents: List[np.ndarray], min_xy: np.ndarray, max_xy: np.ndarray) -> None:
+    if len(min_xy):
+        extents.append(np.concatenate([min_xy.min(axis=0), max_xy.max(axis=0)]))
+
+
+def _angle_in_sweep(angle: np.ndarray, start: np.ndarray, sweep: np.ndarray) -> np.ndarray:
+    return np.mod(angle - start, TWO_PI) <= sweep
+
+
+def measure(batch: GeometryBatch, groups: int) -> Dict[str, Any]:
+    """
+    Métricas por (grupo, tipo): número, longitud (trazos abiertos), perímetro y área
+    (figuras cerradas), más la extensión total. Devuelve
+    {"by_group_type": {(grupo, tipo): {...}}, "extents": (min_x, min_y, max_x, max_y) o None}.
+    """
+    results: Dict[Tuple[int, str], Dict[str, float]] = {}
+    extents: List[np.ndarray] = []
+
+    def record(element_type: str, group_index: List[int], **metrics: np.ndarray) -> None:
+        idx = np.asarray(group_index, dtype=np.int64)
+        counts = np.bincount(idx, minlength=groups)
+        sums = {name: _sum_by_group(values, idx, groups) for name, values in metrics.items()}
+        for group in np.nonzero(counts)[0]:
+            entry = {"count": int(counts[group]), "length": 0.0, "perimeter": 0.0, "area": 0.0}
+            for name, totals in sums.items():
+                entry[name] = float(totals[group])
+            results[(int(group), element_type)] = entry
+
+    if batch.lines:
+        a = np.asarray(batch.lines)
+        record("line", batch.line_groups, length=np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1]))
+        _extend(extents, np.minimum(a[:, :2], a[:, 2:]), np.maximum(a[:, :2], a[:, 2:]))
+
+    if batch.rectangles:
+        r = np.asarray(batch.rectangles)
+        x, y, w, h, theta = r.T
+        record("rectangle", batch.rectangle_groups,
+               perimeter=2 * (np.abs(w) + np.abs(h)), area=np.abs(w * h))
+        # Esquinas rotadas alrededor del centro, como en el frontend
+        cx, cy = x + w / 2, y + h / 2
+        dx = np.stack([-w / 2, w / 2, w / 2, -w / 2], axis=1)
+        dy = np.stack([-h / 2, -h / 2, h / 2, h / 2], axis=1)
+        cos_t, sin_t = np.cos(theta)[:, None], np.sin(theta)[:, None]
+        px = cx[:, None] + dx * cos_t - dy * sin_t
+        py = cy[:, None] + dx * sin_t + dy * cos_t
+        _extend(extents, np.stack([px.min(1), py.min(1)], 1), np.stack([px.max(1), py.max(1)], 1))
+
+    if batch.circles:
+        c = np.asarray(batch.circles)
+        cx, cy, radius = c.T
+        record("circle", batch.circle_groups, perimeter=TWO_PI * radius, area=math.pi * radius ** 2)
+        _extend(extents, np.stack([cx - radius, cy - radius], 1), np.stack([cx + radius, cy + radius], 1))
+
+    if batch.arcs:
+        a = np.asarray(batch.arcs)
+        cx, cy, radius, start, end = a.T
+        sweep = np.mod(end - start, TWO_PI)
+        sweep = np.where((sweep == 0) & (end != start), TWO_PI, sweep)
+        record("arc", batch.arc_groups, length=radius * sweep)
+        # Extremos del arco más los puntos cardinales que caen dentro del barrido
+        angles = np.stack([start, start + sweep], axis=1)
+        xs = cx[:, None] + radius[:, None] * np.cos(angles)
+        ys = cy[:, None] + radius[:, None] * np.sin(angles)
+        min_x, max_x = xs.min(1), xs.max(1)
+        min_y, max_y = ys.min(1), ys.max(1)
+        for k, (ux, uy) in enumerate(((1, 0), (0, 1), (-1, 0), (0, -1))):
+            inside = _angle_in_sweep(np.full_like(start, k * math.pi / 2), start, sweep)
+            qx, qy = cx + ux * radius, cy + uy * radius
+            min_x = np.where(inside, np.minimum(min_x, qx), min_x)
+            max_x = np.where(inside, np.maximum(max_x, qx), max_x)
+            min_y = np.where(inside, np.minimum(min_y, qy), min_y)
+            max_y = np.where(inside, np.maximum(max_y, qy), max_y)
+        _extend(extents, np.stack([min_x, min_y], 1), np.stack([max_x, max_y], 1))
+
+    if batch.polylines:
+        # Todas las polilíneas en un solo array con desplazamientos (formato CSR)
+        vertices = np.concatenate(batch.polylines)
+        sizes = np.array([len(p) for p in batch.polylines])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        closed = np.asarray(batch.polyline_closed) & (sizes > 2)
+        # Siguiente vértice de cada uno; el último enlaza con el primero (solo cuenta si es cerrada)
+        following = np.arange(len(vertices)) + 1
+        following[offsets + sizes - 1] = offsets
+        segment = np.hypot(*(vertices[following] - vertices).T)
+        last = np.zeros(len(vertices), dtype=bool)
+        last[offsets + sizes - 1] = True
+        open_length = np.add.reduceat(np.where(last, 0.0, segment), offsets)
+        closing = segment[offsets + sizes - 1]
+        cross = vertices[:, 0] * vertices[following, 1] - vertices[following, 0] * vertices[:, 1]
+        area = np.abs(np.add.reduceat(cross, offsets)) / 2
+        record(
+            "polyline", batch.polyline_groups,
+            length=np.where(closed, 0.0, open_length),
+            perimeter=np.where(closed, open_length + closing, 0.0),
+            area=np.where(closed, area, 0.0),
+        )
+        per_min = np.minimum.reduceat(vertices, offsets)
+        per_max = np.maximum.reduceat(vertices, offsets)
+        _extend(extents, per_min, per_max)
+
+    if batch.other_types:
+        for element_type in sorted(set(batch.other_types)):
+            groups_of_type = [g for t, g in zip(batch.other_types, batch.other_groups) if t == element_type]
+            record(element_type, groups_of_type)
+        if batch.other_boxes:
+            boxes = np.asarray(batch.other_boxes)
+            _extend(extents, boxes[:, :2], boxes[:, 2:])
+
+    total_extent = None
+    if extents:
+        stacked = np.stack(extents)
+        total_extent = (
+            float(stacked[:, 0].min()), float(stacked[:, 1].min()),
+            float(stacked[:, 2].max()), float(stacked[:, 3].max()),
+        )
+    return {"by_group_type": results, "extents": total_extent}
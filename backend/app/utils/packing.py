@@ -0,0 +1,91 @@
+import base64
+import binascii
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Union
+
+# Codificaciones de coordenadas empaquetadas: x0, y0, x1, y1... en little-endian
+PACKED_ENCODINGS = {"f64le": "d", "f32le": "f"}
+DEFAULT_PACKED_ENCODING = "f64le"
+
+PackedData = Union[str, bytes]
+
+
+def is_packed(points: Any) -> bool:
+    """
+    True si los puntos de una polilínea están en formato empaquetado
+    ({"encoding": "f64le", "data": "<base64>"}) en lugar de lista de objetos
+    """
+    return isinstance(points, dict) and "data" in points
+
+
+def _typecode(encoding: str) -> str:
+    try:
+        return PACKED_ENCODINGS[encoding]
+    except KeyError:
+        raise ValueError(f"Codificación de puntos no soportada: {encoding}")
+
+
+def unpack_coords(packed: Dict[str, Any]) -> array:
+    """
+    Coordenadas intercaladas (x, y) de unos puntos empaquetados.
+    data puede ser base64 (JSON) o bytes (formatos binarios).
+    """
+    coords = array(_typecode(packed.get("encoding", DEFAULT_PACKED_ENCODING)))
+    data = packed["data"]
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data, validate=True)
+        except binascii.Error:
+            raise ValueError("Datos de puntos en base64 inválidos")
+    if len(data) % (2 * coords.itemsize):
+        raise ValueError("Los datos de puntos no contienen pares (x, y) completos")
+    coords.frombytes(data)
+    if sys.byteorder == "big":
+        coords.byteswap()
+    return coords
+
+
+def pack_coords(coords: Iterable[float], encoding: str = DEFAULT_PACKED_ENCODING) -> Dict[str, str]:
+    """
+    Empaqueta coordenadas intercaladas (x, y) en base64
+    """
+    packed = array(_typecode(encoding), coords)
+    if len(packed) % 2:
+        raise ValueError("Número impar de coordenadas")
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return {"encoding": encoding, "data": base64.b64encode(packed.tobytes()).decode("ascii")}
+
+
+def polyline_coords(points: Any) -> array:
+    """
+    Coordenadas intercaladas (x, y) de una polilínea en cualquiera de los dos formatos
+    """
+    if is_packed(points):
+        return unpack_coords(points)
+    coords = array("d")
+    for point in points:
+        coords.append(float(point["x"]))
+        coords.append(float(point["y"]))
+    return coords
+
+
+def validate_packed(packed: Dict[str, Any]) -> None:
+    """
+    Comprueba unos puntos empaquetados sin crear un objeto por punto
+    """
+    coords = unpack_coords(packed)
+    if not all(map(math.isfinite, coords)):
+        raise ValueError("Las coordenadas deben ser números finitos")
+
+
+def packed_to_binary(geometry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia de la geometría con los puntos empaquetados como bytes, para MessagePack
+    """
+    points = geometry.get("points")
+    if not is_packed(points) or not isinstance(points["data"], str):
+        return geometry
+    return {**geometry, "points": {**points, "data": base64.b64decode(points["data"])}}
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from pydantic import TypeAdapter
+
+from app.core.negotiation import dump_json
+from app.models.element import Element
+from app.schemas.element import Element as ElementSchema, ElementStyle
+from app.utils.packing import packed_to_binary
+
+# Columnas que necesita la respuesta (sin la caja envolvente, que no se expone)
+ELEMENT_COLUMNS = [Element.__table__.c[name] for name in ElementSchema.model_fields]
+
+# Fechas con el mismo formato que Pydantic en modo JSON (UTC como "Z")
+_datetime_adapter = TypeAdapter(datetime)
+
+
+def _float(value: Any) -> float:
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    raise TypeError("valor no numérico")
+
+
+def _str(value: Any) -> str:
+    if type(value) is str:
+        return value
+    raise TypeError("valor no textual")
+
+
+def _datetime(value: Any) -> Any:
+    return _datetime_adapter.dump_python(value, mode="json")
+
+
+def _style_converters() -> Dict[str, Callable[[Any], Any]]:
+    converters = {}
+    for name, field in ElementStyle.model_fields.items():
+        converters[name] = _float if field.annotation is float else _str
+    return converters
+
+
+_STYLE_CONVERTERS = _style_converters()
+_DATETIME_FIELDS = frozenset(
+    name for name, field in ElementSchema.model_fields.items() if field.annotation is datetime
+)
+
+
+def element_to_json_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Convierte una fila de elemento en el mismo dict que
+    schemas.Element.model_validate(row).model_dump(mode="json"), sin crear modelos.
+    Si la fila no encaja en el caso rápido se valida con el esquema.
+    """
+    try:
+        data = {}
+        for name in ElementSchema.model_fields:
+            value = row[name]
+            if name == "style":
+                value = {key: convert(value[key]) for key, convert in _STYLE_CONVERTERS.items()}
+            elif name in _DATETIME_FIELDS:
+                value = _datetime(value)
+            data[name] = value
+        return data
+    except (KeyError, TypeError):
+        return ElementSchema.model_validate(dict(row)).model_dump(mode="json")
+
+
+def element_list_payload(
+    rows: Iterable[Mapping[str, Any]],
+    total: Optional[int],
+    next_cursor: Optional[int],
+) -> Dict[str, Any]:
+    """
+    schemas.ElementList en forma JSON construido directamente desde filas
+    """
+    elements: List[Dict[str, Any]] = [element_to_json_dict(row) for row in rows]
+    return {"elements": elements, "total": total, "next_cursor": next_cursor}
+
+
+def render_element_list(
+    rows: Iterable[Mapping[str, Any]],
+    total: Optional[int],
+    next_cursor: Optional[int],
+) -> bytes:
+    """
+    Cuerpo JSON de schemas.ElementList, igual al que genera JSONResponse
+    """
+    return dump_json(element_list_payload(rows, total, next_cursor))
+
+
+def element_to_binary(element: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Elemento en forma JSON con los puntos empaquetados como bytes (formatos binarios)
+    """
+    if element.get("type") != "polyline" or not isinstance(element.get("geometry"), dict):
+        return element
+    return {**element, "geometry": packed_to_binary(element["geometry"])}
+
+
+def element_list_to_binary(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Variante binaria de un payload con lista de elementos
+    """
+    return {**payload, "elements": [element_to_binary(element) for element in payload["elements"]]}
@@ -0,0 +1,78 @@
+import math
+from array import array
+from typing import Any, Sequence
+
+# Claves de geometría con coordenadas o longitudes que se pueden redondear
+# (los ángulos y el tamaño de fuente se dejan intactos)
+ROUNDED_KEYS = frozenset({"x", "y", "width", "height", "radius"})
+
+
+def douglas_peucker(coords: Sequence[float], tolerance: float) -> array:
+    """
+    Simplifica una polilínea dada como coordenadas intercaladas (x, y) con
+    Douglas-Peucker: ningún punto eliminado queda a más de tolerance del resultado
+    """
+    count = len(coords) // 2
+    if count <= 2 or tolerance <= 0:
+        return array("d", coords)
+
+    xs, ys = list(coords[0::2]), list(coords[1::2])
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    # Pila explícita: las polilíneas largas superarían el límite de recursión
+    stack = [(0, count - 1)]
+    tolerance_sq = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length_sq = dx * dx + dy * dy
+
+        farthest, max_dist_sq = -1, tolerance_sq
+        for i, px, py in zip(range(first + 1, last), xs[first + 1:last], ys[first + 1:last]):
+            px -= ax
+            py -= ay
+            if length_sq == 0:
+                dist_sq = px * px + py * py
+            else:
+                # Distancia al segmento (no a la recta) para no perder picos de retorno
+                t = (px * dx + py * dy) / length_sq
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                ex, ey = px - t * dx, py - t * dy
+                dist_sq = ex * ex + ey * ey
+            if dist_sq > max_dist_sq:
+                farthest, max_dist_sq = i, dist_sq
+
+        if farthest >= 0:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    result = array("d")
+    for x, y, kept in zip(xs, ys, keep):
+        if kept:
+            result.append(x)
+            result.append(y)
+    return result
+
+
+def decimals_for(tolerance: float) -> int:
+    """
+    Decimales suficientes para que el redondeo quede muy por debajo de la tolerancia
+    """
+    return max(0, -math.floor(math.log10(tolerance)) + 1)
+
+
+def round_coordinates(value: Any, decimals: int) -> Any:
+    """
+    Copia de una geometría con las coordenadas y longitudes redondeadas
+    """
+    if isinstance(value, dict):
+        return {
+            key: round(item, decimals) if key in ROUNDED_KEYS and isinstance(item, float)
+            else round_coordinates(item, decimals)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [round_coordinates(item, decimals) for item in value]
+    return value
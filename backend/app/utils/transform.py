@@ -0,0 +1,255 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.measure import polyline_array
+from app.utils.packing import DEFAULT_PACKED_ENCODING, is_packed, pack_coords
+
+# Tolerancia relativa para decidir si una transformación conserva ángulos
+CONFORMAL_TOLERANCE = 1e-9
+
+# Resultado por elemento: (tipo, geometría) o None si la geometría no es válida
+Transformed = Optional[Tuple[str, Dict[str, Any]]]
+
+
+def affine(a: float, b: float, c: float, d: float, e: float, f: float) -> np.ndarray:
+    """
+    Matriz 2x3 a partir de los coeficientes de canvas/SVG:
+    x' = a*x + c*y + e, y' = b*x + d*y + f
+    """
+    return np.array([[a, c, e], [b, d, f]], dtype=np.float64)
+
+
+def rotation(angle_deg: float, cx: float, cy: float) -> np.ndarray:
+    """
+    Giro antihorario de angle_deg grados alrededor de (cx, cy)
+    """
+    angle = math.radians(angle_deg)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    return affine(cos_a, sin_a, -sin_a, cos_a, cx - cx * cos_a + cy * sin_a, cy - cx * sin_a - cy * cos_a)
+
+
+def rectangular_array(rows: int, columns: int, row_spacing: float, column_spacing: float) -> np.ndarray:
+    """
+    Traslaciones (k, 2, 3) de una matriz rectangular de copias, sin la posición original
+    """
+    row, column = np.divmod(np.arange(1, rows * columns), columns)
+    matrices = np.zeros((len(row), 2, 3))
+    matrices[:, 0, 0] = matrices[:, 1, 1] = 1
+    matrices[:, 0, 2] = column * column_spacing
+    matrices[:, 1, 2] = row * row_spacing
+    return matrices
+
+
+def polar_array(count: int, cx: float, cy: float, angle: float) -> np.ndarray:
+    """
+    Giros (count - 1, 2, 3) de una matriz polar de count elementos alrededor de (cx, cy).
+    Con un ángulo total de 360 las copias se reparten sin repetir la original.
+    """
+    divisions = count if math.isclose(abs(angle), 360) else count - 1
+    step = angle / divisions
+    return np.stack([rotation(step * k, cx, cy) for k in range(1, count)])
+
+
+def batch_matrices(
+    operations: np.ndarray, count: int, anchors: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matrices (k * count, 2, 3) de aplicar k operaciones a count elementos, agrupadas por
+    operación, junto con el índice de elemento de cada una. Con anchors (count, 2) solo se
+    conserva la traslación que lleva el punto de anclaje de cada elemento a su destino.
+    """
+    operations = np.asarray(operations, dtype=np.float64).reshape(-1, 2, 3)
+    matrices = np.repeat(operations, count, axis=0)
+    element_index = np.tile(np.arange(count), len(operations))
+    if anchors is not None:
+        x, y = anchors[element_index, 0], anchors[element_index, 1]
+        tx, ty = _apply(matrices, x, y)
+        matrices = np.zeros_like(matrices)
+        matrices[:, 0, 0] = matrices[:, 1, 1] = 1
+        matrices[:, 0, 2] = tx - x
+        matrices[:, 1, 2] = ty - y
+    return matrices, element_index
+
+
+def _apply(m: np.ndarray, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return m[:, 0, 0] * x + m[:, 0, 1] * y + m[:, 0, 2], m[:, 1, 0] * x + m[:, 1, 1] * y + m[:, 1, 2]
+
+
+def _linear(m: np.ndarray, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return m[:, 0, 0] * x + m[:, 0, 1] * y, m[:, 1, 0] * x + m[:, 1, 1] * y
+
+
+def _similarity(m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Escala, ángulo del eje x transformado (radianes), si invierte la orientación
+    y si la parte lineal es una semejanza (conserva ángulos y proporciones)
+    """
+    ux, uy, vx, vy = m[:, 0, 0], m[:, 1, 0], m[:, 0, 1], m[:, 1, 1]
+    su, sv = np.hypot(ux, uy), np.hypot(vx, vy)
+    conformal = (
+        np.isclose(su, sv, rtol=CONFORMAL_TOLERANCE, atol=0)
+        & (np.abs(ux * vx + uy * vy) <= CONFORMAL_TOLERANCE * su * sv)
+    )
+    return su, np.arctan2(uy, ux), ux * vy - uy * vx < 0, conformal
+
+
+def _point(x: float, y: float) -> Dict[str, float]:
+    return {"x": float(x), "y": float(y)}
+
+
+def _xy(point: Dict[str, Any]) -> Tuple[float, float]:
+    return float(point["x"]), float(point["y"])
+
+
+def _transform_lines(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    a = np.array([_xy(g["start"]) + _xy(g["end"]) for _, g in items]).reshape(-1, 4)
+    sx, sy = _apply(m, a[:, 0], a[:, 1])
+    ex, ey = _apply(m, a[:, 2], a[:, 3])
+    for k, (i, g) in enumerate(items):
+        out[i] = ("line", {**g, "start": _point(sx[k], sy[k]), "end": _point(ex[k], ey[k])})
+
+
+def _transform_polylines(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    # Todos los vértices en un solo array, con la matriz de su polilínea repetida por vértice
+    arrays = [polyline_array(g["points"]) for _, g in items]
+    sizes = np.array([len(a) for a in arrays])
+    vertices = np.concatenate(arrays) if arrays else np.empty((0, 2))
+    x, y = _apply(np.repeat(m, sizes, axis=0), vertices[:, 0], vertices[:, 1])
+    moved = np.stack([x, y], axis=1)
+    for (i, g), coords in zip(items, np.split(moved, np.cumsum(sizes)[:-1])):
+        points = g["points"]
+        if is_packed(points):
+            # Se conserva el formato y la codificación de entrada
+            new_points = pack_coords(coords.ravel().tolist(), points.get("encoding", DEFAULT_PACKED_ENCODING))
+        else:
+            new_points = [{"x": px, "y": py} for px, py in coords.tolist()]
+        out[i] = ("polyline", {**g, "points": new_points})
+
+
+def _transform_rectangles(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    r = np.array([
+        _xy(g["topLeft"]) + (float(g["width"]), float(g["height"]), math.radians(float(g.get("rotation") or 0)))
+        for _, g in items
+    ]).reshape(-1, 5)
+    x, y, w, h, theta = r.T
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    # El frontend rota alrededor del centro: se transforman el centro y los dos lados
+    cx, cy = _apply(m, x + w / 2, y + h / 2)
+    ux, uy = _linear(m, w * cos_t, w * sin_t)
+    vx, vy = _linear(m, -h * sin_t, h * cos_t)
+    new_w, new_h = np.hypot(ux, uy), np.hypot(vx, vy)
+    # Un cizallamiento o una escala no uniforme sobre un rectángulo girado da un paralelogramo
+    rectangle = np.abs(ux * vx + uy * vy) <= CONFORMAL_TOLERANCE * np.maximum(new_w * new_h, 1e-300)
+    new_rotation = np.degrees(np.arctan2(uy, ux))
+    for k, (i, g) in enumerate(items):
+        if rectangle[k]:
+            out[i] = ("rectangle", {
+                **g,
+                "topLeft": _point(cx[k] - new_w[k] / 2, cy[k] - new_h[k] / 2),
+                "width": float(new_w[k]),
+                "height": float(new_h[k]),
+                "rotation": float(new_rotation[k]),
+            })
+        else:
+            corners = [
+                (cx[k] + (sx * ux[k] + sy * vx[k]) / 2, cy[k] + (sx * uy[k] + sy * vy[k]) / 2)
+                for sx, sy in ((-1, -1), (1, -1), (1, 1), (-1, 1))
+            ]
+            out[i] = ("polyline", {"points": [_point(px, py) for px, py in corners], "closed": True})
+
+
+def _transform_circles(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    c = np.array([_xy(g["center"]) + (abs(float(g["radius"])),) for _, g in items]).reshape(-1, 3)
+    scale = _similarity(m)[0]
+    cx, cy = _apply(m, c[:, 0], c[:, 1])
+    for k, (i, g) in enumerate(items):
+        out[i] = ("circle", {**g, "center": _point(cx[k], cy[k]), "radius": float(c[k, 2] * scale[k])})
+
+
+def _transform_arcs(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    a = np.array([
+        _xy(g["center"]) + (abs(float(g["radius"])), float(g["startAngle"]), float(g["endAngle"]))
+        for _, g in items
+    ]).reshape(-1, 5)
+    scale, phi, mirrored, _ = _similarity(m)
+    cx, cy = _apply(m, a[:, 0], a[:, 1])
+    start, end = a[:, 3], a[:, 4]
+    # Una simetría invierte el sentido de recorrido: los extremos se intercambian
+    new_start = np.where(mirrored, phi - end, phi + start)
+    new_end = np.where(mirrored, phi - start, phi + end)
+    for k, (i, g) in enumerate(items):
+        out[i] = ("arc", {
+            **g,
+            "center": _point(cx[k], cy[k]),
+            "radius": float(a[k, 2] * scale[k]),
+            "startAngle": float(new_start[k]),
+            "endAngle": float(new_end[k]),
+        })
+
+
+def _transform_texts(items: List[Tuple[int, Dict[str, Any]]], m: np.ndarray, out: List[Transformed]) -> None:
+    t = np.array([
+        _xy(g["position"]) + (float(g.get("fontSize") or 12), math.radians(float(g.get("rotation") or 0)))
+        for _, g in items
+    ]).reshape(-1, 4)
+    scale = _similarity(m)[0]
+    px, py = _apply(m, t[:, 0], t[:, 1])
+    # La línea base sigue a la transformación; el texto se mantiene legible tras una simetría
+    bx, by = _linear(m, np.cos(t[:, 3]), np.sin(t[:, 3]))
+    new_rotation = np.degrees(np.arctan2(by, bx))
+    for k, (i, g) in enumerate(items):
+        out[i] = ("text", {
+            **g,
+            "position": _point(px[k], py[k]),
+            "fontSize": float(t[k, 2] * scale[k]),
+            "rotation": float(new_rotation[k]),
+        })
+
+
+_TRANSFORM_FUNCTIONS = {
+    "line": _transform_lines,
+    "polyline": _transform_polylines,
+    "rectangle": _transform_rectangles,
+    "circle": _transform_circles,
+    "arc": _transform_arcs,
+    "text": _transform_texts,
+}
+
+# Tipos que solo admiten semejanzas (no hay elipses ni textos deformados)
+CONFORMAL_TYPES = frozenset({"circle", "arc", "text"})
+
+
+def transform_geometries(
+    types: Sequence[str], geometries: Sequence[Dict[str, Any]], matrices: np.ndarray
+) -> List[Transformed]:
+    """
+    Aplica a cada geometría su matriz afín (n, 2, 3), agrupando por tipo para operar
+    con arrays. Los rectángulos que dejan de serlo se convierten en polilíneas cerradas.
+    Devuelve (tipo, geometría) por elemento, o None si su geometría no es válida.
+    Lanza ValueError si una transformación no uniforme afecta a círculos, arcos o textos.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 2, 3)
+    if CONFORMAL_TYPES & set(types):
+        rows = [i for i, element_type in enumerate(types) if element_type in CONFORMAL_TYPES]
+        if not _similarity(matrices[rows])[3].all():
+            raise ValueError(
+                "Círculos, arcos y textos solo admiten traslación, giro, simetría y escala uniforme"
+            )
+
+    out: List[Transformed] = [None] * len(types)
+    for element_type, func in _TRANSFORM_FUNCTIONS.items():
+        indices = [i for i, t in enumerate(types) if t == element_type]
+        if not indices:
+            continue
+        try:
+            func([(i, geometries[i]) for i in indices], matrices[indices], out)
+        except (KeyError, TypeError, ValueError):
+            # Alguna geometría incompleta: se transforman de una en una para aislarla
+            for i in indices:
+                try:
+                    func([(i, geometries[i])], matrices[[i]], out)
+                except (KeyError, TypeError, ValueError):
+                    out[i] = None
+    return out
@@ -0,0 +1,117 @@
+"""
+Compara la serialización de listas de elementos:
+
+- esquema: objetos tipo ORM validados con schemas.ElementList y renderizados
+  con JSONResponse (lo que hacía get_elements con response_model)
+- filas: app.utils.serialization.render_element_list sobre filas
+
+Comprueba además que ambas salidas son idénticas byte a byte.
+
+Uso (desde backend/):
+    python -m benchmarks.element_serialization --elements 10000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from starlette.responses import JSONResponse
+
+from app.schemas.element import ElementList
+from app.utils.serialization import render_element_list
+
+TYPES = ["line", "polyline", "rectangle", "circle", "arc", "text"]
+
+
+def _point(rng: random.Random) -> Dict[str, float]:
+    return {"x": round(rng.uniform(-1000, 1000), 3), "y": round(rng.uniform(-1000, 1000), 3)}
+
+
+def _geometry(rng: random.Random, element_type: str) -> Dict[str, Any]:
+    if element_type == "line":
+        return {"start": _point(rng), "end": _point(rng)}
+    if element_type == "polyline":
+        return {"points": [_point(rng) for _ in range(rng.randint(3, 40))], "closed": rng.random() < 0.5}
+    if element_type == "rectangle":
+        return {"topLeft": _point(rng), "width": rng.uniform(1, 100), "height": rng.uniform(1, 100), "rotation": 0}
+    if element_type == "circle":
+        return {"center": _point(rng), "radius": rng.uniform(1, 50)}
+    if element_type == "arc":
+        return {"center": _point(rng), "radius": rng.uniform(1, 50), "startAngle": 0, "endAngle": 3.14159}
+    return {"position": _point(rng), "content": "Cota ñ 2,5 m", "fontSize": 12}
+
+
+def make_rows(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(1, count + 1):
+        element_type = rng.choice(TYPES)
+        rows.append({
+            "type": element_type,
+            "layer_id": rng.randint(1, 10),
+            "geometry": _geometry(rng, element_type),
+            # Enteros en el estilo, como los guarda el frontend: el esquema los convierte a float
+            "style": {
+                "strokeColor": "#000000",
+                "strokeWidth": 1,
+                "lineType": "solid",
+                "fillColor": "transparent",
+                "fillOpacity": 1,
+            },
+            "selected": False,
+            "locked": False,
+            "metadata": {},
+            "id": i,
+            "project_id": 1,
+            "revision": i,
+            "created_at": created + timedelta(seconds=i, microseconds=i % 1000),
+            "updated_at": created + timedelta(seconds=i),
+        })
+    return rows
+
+
+def serialize_schema(rows: List[Dict[str, Any]]) -> bytes:
+    elements = [SimpleNamespace(**row) for row in rows]
+    model = ElementList.model_validate(
+        {"elements": elements, "total": len(rows), "next_cursor": None}, from_attributes=True
+    )
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def serialize_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return render_element_list(rows, len(rows), None)
+
+
+def best_of(func: Callable[[], bytes], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.elements)
+    expected = serialize_schema(rows)
+    actual = serialize_rows(rows)
+    if actual != expected:
+        raise SystemExit("Las salidas difieren: la serialización por filas no es equivalente")
+
+    schema_seconds = best_of(lambda: serialize_schema(rows), args.repeat)
+    rows_seconds = best_of(lambda: serialize_rows(rows), args.repeat)
+    print(f"{args.elements} elementos, {len(expected) / 1024:.0f} KiB, salida idéntica")
+    print(f"  esquema: {schema_seconds * 1000:8.1f} ms")
+    print(f"  filas:   {rows_seconds * 1000:8.1f} ms  ({schema_seconds / rows_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from app.services.command_parser import command_parser, split_script
+
+
+def _params(command, unit_system=None):
+    result = command_parser.parse(command, unit_system=unit_system)
+    assert result.recognized, result.error
+    return result.params
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("crear círculo en 10,10 radio 50 cm", {"center": {"x": 10.0, "y": 10.0}, "radius": 0.5}),
+    ("crear círculo en 5,5 con diámetro 10 cm", {"center": {"x": 5.0, "y": 5.0}, "radius": 0.05}),
+    ("crear círculo en 20,30 cm radio 1", {"center": {"x": 0.2, "y": 0.3}, "radius": 1.0}),
+])
+def test_unit_applies_only_to_its_slot(command, expected):
+    assert _params(command) == expected
+
+
+def test_rectangle_with_mixed_units():
+    params = _params("crear rectángulo en 1,1 ancho 200 cm y alto 3")
+    assert params["topLeft"] == {"x": 1.0, "y": 1.0}
+    assert (params["width"], params["height"]) == (2.0, 3.0)
+
+
+def test_unit_after_por_applies_to_both_dimensions():
+    params = _params("crear rectángulo de 2 por 3 cm en 1,1")
+    assert params["topLeft"] == {"x": 1.0, "y": 1.0}
+    assert (params["width"], params["height"]) == (0.02, 0.03)
+
+
+def test_unit_per_coordinate():
+    params = _params("crear línea de 0,0 a 1 m,20 cm")
+    assert params == {"start": {"x": 0.0, "y": 0.0}, "end": {"x": 1.0, "y": 0.2}}
+
+
+def test_exponent_is_part_of_the_number():
+    params = _params("crear círculo en 1e3,2.5E-1 radio 1e-2")
+    assert params == {"center": {"x": 1000.0, "y": 0.25}, "radius": 0.01}
+
+
+def test_imperial_project_converts_to_feet():
+    params = _params("crear círculo en 10,10 radio 12 in", unit_system="imperial")
+    assert params == {"center": {"x": 10.0, "y": 10.0}, "radius": 1.0}
+    assert _params("crear línea de 0,0 a 3,0 m", unit_system="imperial")["end"]["x"] == pytest.approx(3 / 0.3048)
+
+
+def test_arc_angle_unit_at_the_end():
+    params = _params("crear arco en 0,0 con radio 5 de 0 a 90 grados")
+    assert params["startAngle"] == 0
+    assert params["endAngle"] == pytest.approx(math.pi / 2)
+
+
+def test_unknown_command_is_not_recognized():
+    assert not command_parser.parse("hola mundo").recognized
+    assert command_parser.parse("crear círculo radio 5").error
+
+
+def test_split_script_keeps_polyline_points_together():
+    script = "crear polilínea 0,0; 5,0; 5,5\ncrear círculo en 0,0 radio 1; dibujar línea de 0,0 a 1,1"
+    assert split_script(script) == [
+        "crear polilínea 0,0; 5,0; 5,5",
+        "crear círculo en 0,0 radio 1",
+        "dibujar línea de 0,0 a 1,1",
+    ]
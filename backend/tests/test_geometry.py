@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+from app.utils.geometry import snap_points
+from app.utils.packing import pack_coords
+
+
+def _by_kind(points):
+    kinds = {}
+    for x, y, kind in points:
+        kinds.setdefault(kind, []).append((round(x, 9), round(y, 9)))
+    return {kind: sorted(values) for kind, values in kinds.items()}
+
+
+def test_line_endpoints_and_midpoint():
+    points = snap_points("line", {"start": {"x": 0, "y": 0}, "end": {"x": 4, "y": 2}})
+    assert _by_kind(points) == {"endpoint": [(0, 0), (4, 2)], "midpoint": [(2, 1)]}
+
+
+def test_closed_polyline_includes_closing_midpoint():
+    geometry = {"points": [{"x": 0, "y": 0}, {"x": 2, "y": 0}, {"x": 2, "y": 2}], "closed": True}
+    assert _by_kind(snap_points("polyline", geometry))["midpoint"] == [(1, 0), (1, 1), (2, 1)]
+    geometry["closed"] = False
+    assert _by_kind(snap_points("polyline", geometry))["midpoint"] == [(1, 0), (2, 1)]
+
+
+def test_packed_polyline_matches_point_list():
+    coords = [0.0, 0.0, 3.0, 0.0, 3.0, 4.0]
+    packed = {"points": pack_coords(coords, "f64le")}
+    listed = {"points": [{"x": x, "y": y} for x, y in zip(coords[0::2], coords[1::2])]}
+    assert snap_points("polyline", packed) == snap_points("polyline", listed)
+
+
+def test_rotated_rectangle_corners_and_center():
+    geometry = {"topLeft": {"x": 0, "y": 0}, "width": 2, "height": 2, "rotation": 90}
+    kinds = _by_kind(snap_points("rectangle", geometry))
+    # Giro alrededor del centro: las esquinas de un cuadrado coinciden con las originales
+    assert kinds["endpoint"] == [(0, 0), (0, 2), (2, 0), (2, 2)]
+    assert kinds["center"] == [(1, 1)]
+    assert len(kinds["midpoint"]) == 4
+
+
+def test_circle_center_and_quadrants():
+    kinds = _by_kind(snap_points("circle", {"center": {"x": 1, "y": 1}, "radius": -2}))
+    assert kinds == {"center": [(1, 1)], "quadrant": [(-1, 1), (1, -1), (1, 3), (3, 1)]}
+
+
+def test_arc_only_quadrants_inside_sweep():
+    geometry = {"center": {"x": 0, "y": 0}, "radius": 1, "startAngle": 0, "endAngle": math.pi}
+    kinds = _by_kind(snap_points("arc", geometry))
+    assert kinds["endpoint"] == [(-1, 0), (1, 0)]
+    assert kinds["midpoint"] == [(0, 1)]
+    assert (0, -1) not in kinds["quadrant"]
+    assert (0, 1) in kinds["quadrant"]
+
+
+def test_text_insertion_point():
+    assert snap_points("text", {"position": {"x": 5, "y": 6}, "text": "a"}) == [(5.0, 6.0, "insertion")]
+
+
+@pytest.mark.parametrize("element_type, geometry", [
+    ("line", {"start": {"x": 0, "y": 0}}),
+    ("circle", {"center": {"x": "a", "y": 0}, "radius": 1}),
+    ("unknown", {"x": 0}),
+    ("line", {}),
+])
+def test_invalid_geometry_gives_no_points(element_type, geometry):
+    assert snap_points(element_type, geometry) == []
@@ -0,0 +1,98 @@
+import math
+
+import pytest
+
+from app.utils.measure import GeometryBatch, measure
+from app.utils.packing import pack_coords
+
+
+def _measure(*elements, groups=1):
+    batch = GeometryBatch()
+    for element in elements:
+        group, element_type, geometry = element[:3]
+        batch.add(group, element_type, geometry, element[3] if len(element) > 3 else None)
+    return batch, measure(batch, groups)
+
+
+def test_lines_are_summed_per_group():
+    _, result = _measure(
+        (0, "line", {"start": {"x": 0, "y": 0}, "end": {"x": 3, "y": 4}}),
+        (0, "line", {"start": {"x": 0, "y": 0}, "end": {"x": 1, "y": 0}}),
+        (1, "line", {"start": {"x": 0, "y": 0}, "end": {"x": 0, "y": 2}}),
+        groups=2,
+    )
+    by_group = result["by_group_type"]
+    assert by_group[(0, "line")] == {"count": 2, "length": 6.0, "perimeter": 0.0, "area": 0.0}
+    assert by_group[(1, "line")]["length"] == 2.0
+    assert result["extents"] == (0.0, 0.0, 3.0, 4.0)
+
+
+def test_rotated_rectangle_extent():
+    _, result = _measure((0, "rectangle", {"topLeft": {"x": 0, "y": 0}, "width": 2, "height": 2, "rotation": 45}))
+    entry = result["by_group_type"][(0, "rectangle")]
+    assert entry["perimeter"] == 8.0 and entry["area"] == 4.0
+    half = math.sqrt(2)
+    assert result["extents"] == pytest.approx((1 - half, 1 - half, 1 + half, 1 + half))
+
+
+def test_circle_and_arc():
+    _, result = _measure(
+        (0, "circle", {"center": {"x": 0, "y": 0}, "radius": -2}),
+        (0, "arc", {"center": {"x": 10, "y": 0}, "radius": 1, "startAngle": 0, "endAngle": math.pi / 2}),
+    )
+    by_group = result["by_group_type"]
+    assert by_group[(0, "circle")]["perimeter"] == pytest.approx(4 * math.pi)
+    assert by_group[(0, "circle")]["area"] == pytest.approx(4 * math.pi)
+    assert by_group[(0, "arc")]["length"] == pytest.approx(math.pi / 2)
+    assert result["extents"] == pytest.approx((-2, -2, 11, 2))
+
+
+def test_arc_crossing_zero_includes_quadrant_in_extent():
+    _, result = _measure(
+        (0, "arc", {"center": {"x": 0, "y": 0}, "radius": 1, "startAngle": -math.pi / 4, "endAngle": math.pi / 4}),
+    )
+    assert result["by_group_type"][(0, "arc")]["length"] == pytest.approx(math.pi / 2)
+    min_x, min_y, max_x, max_y = result["extents"]
+    assert max_x == pytest.approx(1)
+    assert min_x == pytest.approx(math.sqrt(2) / 2)
+    assert (min_y, max_y) == pytest.approx((-math.sqrt(2) / 2, math.sqrt(2) / 2))
+
+
+def test_open_and_closed_polylines():
+    square = [{"x": 0, "y": 0}, {"x": 2, "y": 0}, {"x": 2, "y": 2}, {"x": 0, "y": 2}]
+    _, result = _measure(
+        (0, "polyline", {"points": square, "closed": True}),
+        (1, "polyline", {"points": square, "closed": False}),
+        groups=2,
+    )
+    by_group = result["by_group_type"]
+    assert by_group[(0, "polyline")] == {"count": 1, "length": 0.0, "perimeter": 8.0, "area": 4.0}
+    assert by_group[(1, "polyline")] == {"count": 1, "length": 6.0, "perimeter": 0.0, "area": 0.0}
+
+
+def test_packed_polyline_matches_point_list():
+    coords = [0.0, 0.0, 3.0, 0.0, 3.0, 4.0]
+    listed = [{"x": x, "y": y} for x, y in zip(coords[0::2], coords[1::2])]
+    _, packed = _measure((0, "polyline", {"points": pack_coords(coords, "f32le"), "closed": True}))
+    _, plain = _measure((0, "polyline", {"points": listed, "closed": True}))
+    assert packed == plain
+    assert plain["by_group_type"][(0, "polyline")]["area"] == 6.0
+
+
+def test_other_types_count_and_use_stored_bbox():
+    _, result = _measure((0, "text", {"position": {"x": 0, "y": 0}, "text": "a"}, (1.0, 2.0, 3.0, 4.0)))
+    assert result["by_group_type"][(0, "text")]["count"] == 1
+    assert result["extents"] == (1.0, 2.0, 3.0, 4.0)
+
+
+def test_invalid_geometries_are_counted_apart():
+    batch, result = _measure(
+        (0, "line", {"start": {"x": 0, "y": 0}}),
+        (0, "circle", {"center": {"x": 0, "y": 0}, "radius": "x"}),
+        (0, "polyline", {"points": []}),
+        (0, "polyline", {"points": {"encoding": "f64le", "data": "no es base64!"}}),
+        (0, "polyline", {"points": {"encoding": "f64le", "data": "AAAA"}}),
+        (0, "polyline", {"points": {"encoding": "i16", "data": "AAAA"}}),
+    )
+    assert batch.invalid == 6
+    assert result == {"by_group_type": {}, "extents": None}
@@ -0,0 +1,68 @@
+import math
+import random
+
+from app.utils.simplify import douglas_peucker
+
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def _max_deviation(original, simplified):
+    points = list(zip(original[0::2], original[1::2]))
+    kept = list(zip(simplified[0::2], simplified[1::2]))
+    return max(
+        min(_segment_distance(px, py, *a, *b) for a, b in zip(kept, kept[1:]))
+        for px, py in points
+    )
+
+
+def test_collinear_points_are_removed():
+    coords = [0, 0, 1, 0, 2, 0, 3, 0, 4, 0]
+    assert list(douglas_peucker(coords, 0.01)) == [0, 0, 4, 0]
+
+
+def test_peak_above_tolerance_is_kept():
+    coords = [0, 0, 1, 0, 2, 5, 3, 0, 4, 0]
+    assert list(douglas_peucker(coords, 1)) == [0, 0, 2, 5, 4, 0]
+    assert list(douglas_peucker(coords, 10)) == [0, 0, 4, 0]
+
+
+def test_spike_beyond_segment_end_is_kept():
+    # El punto está sobre la recta de los extremos pero fuera del segmento
+    coords = [0, 0, 10, 0, 5, 0]
+    assert list(douglas_peucker(coords, 1)) == [0, 0, 10, 0, 5, 0]
+
+
+def test_closed_ring_with_equal_endpoints():
+    coords = [0, 0, 4, 0, 4, 4, 0, 4, 0, 0]
+    assert list(douglas_peucker(coords, 0.5)) == coords
+
+
+def test_short_input_and_zero_tolerance_are_unchanged():
+    assert list(douglas_peucker([1, 2, 3, 4], 10)) == [1, 2, 3, 4]
+    assert list(douglas_peucker([0, 0, 1, 0.1, 2, 0], 0)) == [0, 0, 1, 0.1, 2, 0]
+    assert list(douglas_peucker([], 1)) == []
+
+
+def test_deviation_stays_within_tolerance():
+    rng = random.Random(7)
+    coords = []
+    x = y = 0.0
+    for _ in range(500):
+        x += rng.uniform(0, 1)
+        y += rng.uniform(-1, 1)
+        coords += [x, y]
+    simplified = douglas_peucker(coords, 0.75)
+    assert len(simplified) < len(coords)
+    assert list(simplified[:2]) == coords[:2] and list(simplified[-2:]) == coords[-2:]
+    assert _max_deviation(coords, simplified) <= 0.75 + 1e-9
+
+
+def test_deep_split_does_not_hit_recursion_limit():
+    # En un zigzag cada división deja un tramo de un solo punto: profundidad lineal
+    coords = [c for i in range(1500) for c in (float(i), float(i % 2))]
+    assert len(douglas_peucker(coords, 0.1)) == len(coords)
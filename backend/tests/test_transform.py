@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.packing import is_packed, pack_coords, polyline_coords
+from app.utils.transform import (
+    affine,
+    batch_matrices,
+    polar_array,
+    rectangular_array,
+    rotation,
+    transform_geometries,
+)
+
+MIRROR_X = affine(-1, 0, 0, 1, 0, 0)  # simetría respecto al eje y
+
+
+def _one(element_type, geometry, matrix):
+    return transform_geometries([element_type], [geometry], matrix[None])[0]
+
+
+def _xy(point):
+    return point["x"], point["y"]
+
+
+def _arc_points(geometry):
+    cx, cy = _xy(geometry["center"])
+    r = geometry["radius"]
+    start, end = geometry["startAngle"], geometry["endAngle"]
+    sweep = (end - start) % (2 * math.pi)
+    return np.array([
+        (cx + r * math.cos(start + t * sweep), cy + r * math.sin(start + t * sweep))
+        for t in (0, 0.5, 1)
+    ])
+
+
+def test_line_translation():
+    result = _one("line", {"start": {"x": 0, "y": 0}, "end": {"x": 1, "y": 2}}, affine(1, 0, 0, 1, 5, -1))
+    assert result == ("line", {"start": {"x": 5.0, "y": -1.0}, "end": {"x": 6.0, "y": 1.0}})
+
+
+def test_rotation_keeps_rectangle():
+    geometry = {"topLeft": {"x": 0, "y": 0}, "width": 4, "height": 2, "rotation": 0}
+    element_type, result = _one("rectangle", geometry, rotation(90, 0, 0))
+    assert element_type == "rectangle"
+    assert (result["width"], result["height"], result["rotation"]) == pytest.approx((4, 2, 90))
+    # El centro (2, 1) gira a (-1, 2)
+    assert _xy(result["topLeft"]) == pytest.approx((-3, 1))
+
+
+def test_non_uniform_scale_on_axis_aligned_rectangle():
+    geometry = {"topLeft": {"x": 1, "y": 1}, "width": 2, "height": 2}
+    element_type, result = _one("rectangle", geometry, affine(3, 0, 0, 0.5, 0, 0))
+    assert element_type == "rectangle"
+    assert _xy(result["topLeft"]) == pytest.approx((3, 0.5))
+    assert (result["width"], result["height"]) == pytest.approx((6, 1))
+
+
+def test_sheared_rectangle_becomes_closed_polyline():
+    geometry = {"topLeft": {"x": 0, "y": 0}, "width": 2, "height": 1}
+    element_type, result = _one("rectangle", geometry, affine(1, 0, 1, 1, 0, 0))  # x' = x + y
+    assert element_type == "polyline"
+    assert result["closed"] is True
+    corners = sorted((round(p["x"], 9), round(p["y"], 9)) for p in result["points"])
+    assert corners == [(0, 0), (1, 1), (2, 0), (3, 1)]
+
+
+def test_mirrored_arc_keeps_its_side():
+    geometry = {"center": {"x": 1, "y": 0}, "radius": 1, "startAngle": 0, "endAngle": math.pi / 2}
+    element_type, result = _one("arc", geometry, MIRROR_X)
+    assert element_type == "arc"
+    expected = _arc_points(geometry) * [-1, 1]
+    # Los extremos se intercambian y el punto medio queda en el mismo lado del arco
+    assert _arc_points(result) == pytest.approx(expected[::-1])
+
+
+def test_rotated_and_scaled_arc():
+    geometry = {"center": {"x": 0, "y": 0}, "radius": 1, "startAngle": 0, "endAngle": math.pi}
+    matrix = affine(0, 2, -2, 0, 0, 0)  # giro de 90 grados y escala 2
+    _, result = _one("arc", geometry, matrix)
+    assert result["radius"] == pytest.approx(2)
+    assert _arc_points(result) == pytest.approx(np.array([(0, 2), (-2, 0), (0, -2)]))
+
+
+def test_circle_uniform_scale():
+    _, result = _one("circle", {"center": {"x": 1, "y": 1}, "radius": 2}, affine(-3, 0, 0, 3, 0, 0))
+    assert _xy(result["center"]) == pytest.approx((-3, 3))
+    assert result["radius"] == pytest.approx(6)
+
+
+@pytest.mark.parametrize("element_type, geometry", [
+    ("circle", {"center": {"x": 0, "y": 0}, "radius": 1}),
+    ("arc", {"center": {"x": 0, "y": 0}, "radius": 1, "startAngle": 0, "endAngle": 1}),
+    ("text", {"position": {"x": 0, "y": 0}, "text": "a"}),
+])
+def test_non_similarity_on_conformal_types_is_rejected(element_type, geometry):
+    with pytest.raises(ValueError):
+        _one(element_type, geometry, affine(2, 0, 0, 1, 0, 0))
+
+
+def test_mirrored_text_stays_readable():
+    geometry = {"position": {"x": 1, "y": 0}, "text": "a", "fontSize": 10, "rotation": 0}
+    _, result = _one("text", geometry, MIRROR_X)
+    assert _xy(result["position"]) == pytest.approx((-1, 0))
+    assert result["fontSize"] == pytest.approx(10)
+    assert result["rotation"] == pytest.approx(180)
+
+
+def test_packed_polyline_keeps_encoding():
+    geometry = {"points": pack_coords([0.0, 0.0, 1.0, 2.0], "f32le"), "closed": False}
+    _, result = _one("polyline", geometry, affine(1, 0, 0, 1, 1, 1))
+    assert is_packed(result["points"]) and result["points"]["encoding"] == "f32le"
+    assert list(polyline_coords(result["points"])) == [1.0, 1.0, 2.0, 3.0]
+
+
+def test_invalid_geometry_is_isolated():
+    types = ["line", "line", "polyline"]
+    geometries = [
+        {"start": {"x": 0, "y": 0}, "end": {"x": 1, "y": 0}},
+        {"start": {"x": 0, "y": 0}},
+        {"points": [{"x": "a", "y": 0}]},
+    ]
+    matrices = np.repeat(affine(1, 0, 0, 1, 1, 0)[None], 3, axis=0)
+    result = transform_geometries(types, geometries, matrices)
+    assert result[0] == ("line", {"start": {"x": 1.0, "y": 0.0}, "end": {"x": 2.0, "y": 0.0}})
+    assert result[1:] == [None, None]
+
+
+def test_array_operations():
+    assert rectangular_array(2, 3, 10, 5)[:, :, 2].tolist() == [[5, 0], [10, 0], [0, 10], [5, 10], [10, 10]]
+    # 360 grados: las copias se reparten sin repetir la original
+    full = polar_array(4, 0, 0, 360)
+    assert len(full) == 3
+    assert full[-1] == pytest.approx(rotation(270, 0, 0))
+    assert polar_array(3, 0, 0, 90)[-1] == pytest.approx(rotation(90, 0, 0))
+
+
+def test_batch_matrices_with_anchors_only_translate():
+    operations = polar_array(2, 0, 0, 180)
+    anchors = np.array([[1.0, 0.0], [0.0, 2.0]])
+    matrices, element_index = batch_matrices(operations, 2, anchors)
+    assert element_index.tolist() == [0, 1]
+    assert matrices[:, :, :2] == pytest.approx(np.repeat(np.eye(2)[None], 2, axis=0))
+    assert matrices[:, :, 2] == pytest.approx(np.array([[-2, 0], [0, -4]]))
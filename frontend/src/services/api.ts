@@ -79,6 +79,10 @@ export const elementService = {
         const response = await api.put(`/elements/${id}`, elementData);
         return response.data;
     },
+    transformElements: async (transformData: any) => {
+        const response = await api.post('/elements/transform', transformData);
+        return response.data;
+    },
     deleteElement: async (id: number) => {
         const response = await api.delete(`/elements/${id}`);
         return response.data;